@@ -1,108 +1,328 @@
 import logging
+from collections import deque
 import pandas as pd
 from typing import Dict, List, Optional
 import numpy as np
 import ta
-from ta.trend import MACD, EMAIndicator, SMAIndicator
+from ta.trend import MACD, SMAIndicator
 from ta.momentum import RSIIndicator
 from ta.volatility import BollingerBands
+FEATURE_LOWER_BOUNDS = np.array([0.0, -10.0, -10.0, -10.0, -50.0, -50.0, -10.0, -10.0, 0.1, -10.0, -50.0, -10.0])
+FEATURE_UPPER_BOUNDS = np.array([100.0, 10.0, 10.0, 10.0, 50.0, 50.0, 10.0, 10.0, 10.0, 10.0, 50.0, 10.0])
+SIGNAL_THRESHOLDS = {
+    'rsi_oversold': 30.0,
+    'rsi_overbought': 70.0,
+    'bb_lower': 0.2,
+    'bb_upper': 0.8,
+    'volume_high': 1.5,
+    'volume_low': 0.7,
+    'vote_margin': 1
+}
+def score_trading_signals(current_rsi: float, current_macd: float, current_macd_signal: float,
+                          bb_position: float, volume_ratio: float, rsi_oversold: float = 30.0,
+                          rsi_overbought: float = 70.0, bb_lower: float = 0.2, bb_upper: float = 0.8,
+                          volume_high: float = 1.5, volume_low: float = 0.7, vote_margin: int = 1) -> Dict:
+    buy_signals = 0
+    sell_signals = 0
+    if current_rsi < rsi_oversold:
+        buy_signals += 2
+    elif current_rsi > rsi_overbought:
+        sell_signals += 2
+    if current_macd > current_macd_signal:
+        buy_signals += 1
+    elif current_macd < current_macd_signal:
+        sell_signals += 1
+    if bb_position < bb_lower:
+        buy_signals += 1
+    elif bb_position > bb_upper:
+        sell_signals += 1
+    volume_signal = 'HIGH' if volume_ratio > volume_high else ('LOW' if volume_ratio < volume_low else 'NORMAL')
+    if volume_ratio > volume_high:
+        if buy_signals > sell_signals:
+            buy_signals += 1
+        elif sell_signals > buy_signals:
+            sell_signals += 1
+    if buy_signals > sell_signals + vote_margin:
+        signal = 'BUY'
+        strength = min(0.9, 0.5 + (buy_signals - sell_signals) * 0.1)
+    elif sell_signals > buy_signals + vote_margin:
+        signal = 'SELL' 
+        strength = min(0.9, 0.5 + (sell_signals - buy_signals) * 0.1)
+    else:
+        signal = 'HOLD'
+        strength = 0.5
+    macd_signal_str = 'BULLISH' if current_macd > current_macd_signal else ('BEARISH' if current_macd < current_macd_signal else 'NEUTRAL')
+    bb_signal_str = 'OVERSOLD' if bb_position < bb_lower else ('OVERBOUGHT' if bb_position > bb_upper else 'NEUTRAL')
+    return {
+        'signal': signal,
+        'strength': strength,
+        'indicators': {
+            'rsi': current_rsi,
+            'macd_signal': macd_signal_str,
+            'bb_signal': bb_signal_str,
+            'volume_signal': volume_signal
+        }
+    }
+SIGNAL_CODES = {'BUY': 1, 'HOLD': 0, 'SELL': -1}
+def score_trading_signal_arrays(rsi: np.ndarray, macd: np.ndarray, macd_signal: np.ndarray,
+                                bb_position: np.ndarray, volume_ratio: np.ndarray, rsi_oversold: float = 30.0,
+                                rsi_overbought: float = 70.0, bb_lower: float = 0.2, bb_upper: float = 0.8,
+                                volume_high: float = 1.5, volume_low: float = 0.7, vote_margin: int = 1):
+    with np.errstate(invalid='ignore'):
+        buy_signals = 2 * (rsi < rsi_oversold) + (macd > macd_signal) + (bb_position < bb_lower)
+        sell_signals = 2 * (rsi > rsi_overbought) + (macd < macd_signal) + (bb_position > bb_upper)
+        high_volume = volume_ratio > volume_high
+    buy_signals, sell_signals = (buy_signals + (high_volume & (buy_signals > sell_signals)),
+                                 sell_signals + (high_volume & (sell_signals > buy_signals)))
+    signals = np.select([buy_signals > sell_signals + vote_margin, sell_signals > buy_signals + vote_margin],
+                        [SIGNAL_CODES['BUY'], SIGNAL_CODES['SELL']], SIGNAL_CODES['HOLD']).astype(np.int8)
+    strengths = np.where(signals != 0, np.minimum(0.9, 0.5 + np.abs(buy_signals - sell_signals) * 0.1), 0.5)
+    return signals, strengths
+def default_trading_signal() -> Dict:
+    return {
+        'signal': 'HOLD',
+        'strength': 0.5,
+        'indicators': {
+            'rsi': 50,
+            'macd_signal': 'NEUTRAL',
+            'bb_signal': 'NEUTRAL',
+            'volume_signal': 'NORMAL'
+        }
+    }
+class IndicatorStream:
+    def __init__(self, symbol: str = '', exchange: str = ''):
+        self.symbol = symbol
+        self.exchange = exchange
+        self.bar_count = 0
+        self.prev_close = None
+        self.rsi_up = None
+        self.rsi_down = None
+        self.ema_12 = None
+        self.ema_26 = None
+        self.macd_signal = None
+        self.macd_signal_count = 0
+        self.atr = 0.0
+        self.true_range_sum = 0.0
+        self.closes = deque(maxlen=50)
+        self.volumes = deque(maxlen=20)
+        self.returns = deque(maxlen=20)
+    @staticmethod
+    def _ema_step(previous: Optional[float], value: float, alpha: float) -> float:
+        return value if previous is None else previous + alpha * (value - previous)
+    def _advance(self, high: float, low: float, close: float, volume: float):
+        if self.prev_close is None:
+            diff = 0.0
+            true_range = high - low
+        else:
+            diff = close - self.prev_close
+            true_range = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+            self.returns.append(close / self.prev_close - 1 if self.prev_close != 0 else float('nan'))
+        self.rsi_up = self._ema_step(self.rsi_up, max(diff, 0.0), 1 / 14)
+        self.rsi_down = self._ema_step(self.rsi_down, max(-diff, 0.0), 1 / 14)
+        self.ema_12 = self._ema_step(self.ema_12, close, 2 / 13)
+        self.ema_26 = self._ema_step(self.ema_26, close, 2 / 27)
+        if self.bar_count < 13:
+            self.true_range_sum += true_range
+        elif self.bar_count == 13:
+            self.atr = (self.true_range_sum + true_range) / 14
+        else:
+            self.atr = (self.atr * 13 + true_range) / 14
+        self.bar_count += 1
+        if self.bar_count >= 26:
+            self.macd_signal = self._ema_step(self.macd_signal, self.ema_12 - self.ema_26, 2 / 10)
+            self.macd_signal_count += 1
+        self.closes.append(close)
+        self.volumes.append(volume)
+        self.prev_close = close
+    def _current_indicators(self) -> Dict[str, float]:
+        nan = float('nan')
+        close = self.closes[-1]
+        if self.bar_count < 14:
+            rsi = nan
+        elif self.rsi_down == 0:
+            rsi = 100.0
+        else:
+            rsi = 100 - 100 / (1 + self.rsi_up / self.rsi_down)
+        macd_line = self.ema_12 - self.ema_26 if self.bar_count >= 26 else nan
+        macd_signal = self.macd_signal if self.macd_signal_count >= 9 else nan
+        last_20 = np.fromiter(self.closes, dtype=float)[-20:]
+        if len(last_20) == 20:
+            sma_20 = last_20.mean()
+            bb_dev = last_20.std()
+            bb_high = sma_20 + 2 * bb_dev
+            bb_low = sma_20 - 2 * bb_dev
+        else:
+            sma_20 = bb_high = bb_low = nan
+        sma_50 = sum(self.closes) / 50 if len(self.closes) == 50 else nan
+        volume_sma_20 = sum(self.volumes) / 20 if len(self.volumes) == 20 else nan
+        if len(self.returns) == 20:
+            volatility = float(np.std(np.fromiter(self.returns, dtype=float), ddof=1))
+        else:
+            volatility = nan
+        return {
+            'close': close,
+            'rsi': rsi,
+            'macd': macd_line,
+            'macd_signal': macd_signal,
+            'sma_20': sma_20,
+            'sma_50': sma_50,
+            'bb_high': bb_high,
+            'bb_low': bb_low,
+            'volume': self.volumes[-1],
+            'volume_sma_20': volume_sma_20,
+            'volatility': volatility,
+            'momentum_base': self.closes[-5] if len(self.closes) >= 5 else nan,
+            'atr': self.atr
+        }
+    def feature_vector(self) -> List[float]:
+        if self.bar_count < 50:
+            return [0.0] * 12
+        values = self._current_indicators()
+        close = values['close']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            bb_range = np.float64(values['bb_high']) - values['bb_low']
+            volume_sma_20 = np.float64(values['volume_sma_20'])
+            features = np.array([
+                values['rsi'],
+                values['macd'],
+                values['macd_signal'],
+                values['macd'] - values['macd_signal'],
+                (close / np.float64(values['sma_20']) - 1) * 100,
+                (close / np.float64(values['sma_50']) - 1) * 100,
+                (close - values['bb_low']) / bb_range,
+                bb_range / np.float64(values['sma_20']),
+                values['volume'] / volume_sma_20 if volume_sma_20 != 0 else 1.0,
+                values['volatility'],
+                (close / np.float64(values['momentum_base']) - 1) * 100,
+                values['atr'] / np.float64(close) * 100
+            ], dtype=float)
+        features[~np.isfinite(features)] = 0.0
+        np.clip(features, FEATURE_LOWER_BOUNDS, FEATURE_UPPER_BOUNDS, out=features)
+        return [float(feature) for feature in features]
+    def trading_signal(self) -> Dict:
+        if self.bar_count < 50:
+            return default_trading_signal()
+        values = self._current_indicators()
+        bb_position = 0.5
+        if values['bb_high'] > values['bb_low']:
+            bb_position = (values['close'] - values['bb_low']) / (values['bb_high'] - values['bb_low'])
+        if values['volume_sma_20'] > 0:
+            volume_ratio = values['volume'] / values['volume_sma_20']
+        else:
+            volume_ratio = 1.0
+        macd_line = 0.0 if np.isnan(values['macd']) else values['macd']
+        macd_signal = 0.0 if np.isnan(values['macd_signal']) else values['macd_signal']
+        return score_trading_signals(values['rsi'], macd_line, macd_signal, bb_position, volume_ratio)
+    def update(self, bar) -> Dict:
+        self._advance(float(bar['High']), float(bar['Low']), float(bar['Close']), float(bar['Volume']))
+        return {
+            'symbol': self.symbol,
+            'exchange': self.exchange,
+            'bar_count': self.bar_count,
+            'signal': self.trading_signal(),
+            'features': self.feature_vector()
+        }
+    def warm_up(self, data: pd.DataFrame) -> int:
+        if data is None or data.empty:
+            return 0
+        columns = data[['High', 'Low', 'Close', 'Volume']].to_numpy(dtype=float)
+        for high, low, close, volume in columns:
+            self._advance(high, low, close, volume)
+        return len(columns)
 class TechnicalAnalyzer:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
+        self.streams = {}
         self.logger.info("Real Technical Analyzer initialized with TA library")
     def get_feature_vector(self, data: pd.DataFrame) -> List[float]:
         try:
             if data is None or len(data) < 50:
                 self.logger.warning("Insufficient data for feature calculation")
                 return [0.0] * 12
-            features = []
+            feature_matrix = self.get_feature_matrix(data)
+            normalized_features = [float(feature) for feature in feature_matrix[-1]]
+            self.logger.debug(f"Generated feature vector: {len(normalized_features)} features")
+            return normalized_features
+        except Exception as e:
+            self.logger.error(f"Error calculating feature vector: {e}")
+            return [0.0] * 12
+    def get_feature_matrix(self, data: pd.DataFrame) -> np.ndarray:
+        try:
+            if data is None or len(data) < 50:
+                self.logger.warning("Insufficient data for feature calculation")
+                return np.zeros((0 if data is None else len(data), 12))
             close_prices = data['Close']
             high_prices = data['High']
             low_prices = data['Low']
             volume = data['Volume']
             rsi = RSIIndicator(close=close_prices, window=14).rsi()
-            features.append(float(rsi.iloc[-1]) if not rsi.empty else 50.0)
             macd = MACD(close=close_prices, window_fast=12, window_slow=26, window_sign=9)
-            macd_line = macd.macd()
-            macd_signal = macd.macd_signal()
-            macd_histogram = macd.macd_diff()
-            features.append(float(macd_line.iloc[-1]) if not macd_line.empty else 0.0)
-            features.append(float(macd_signal.iloc[-1]) if not macd_signal.empty else 0.0)
-            features.append(float(macd_histogram.iloc[-1]) if not macd_histogram.empty else 0.0)
             sma_20 = SMAIndicator(close=close_prices, window=20).sma_indicator()
             sma_50 = SMAIndicator(close=close_prices, window=50).sma_indicator()
-            ema_12 = EMAIndicator(close=close_prices, window=12).ema_indicator()
-            current_price = float(close_prices.iloc[-1])
-            sma_20_ratio = (current_price / float(sma_20.iloc[-1]) - 1) * 100 if not sma_20.empty else 0.0
-            sma_50_ratio = (current_price / float(sma_50.iloc[-1]) - 1) * 100 if not sma_50.empty else 0.0
-            features.append(sma_20_ratio)
-            features.append(sma_50_ratio)
+            sma_20_ratio = (close_prices / sma_20 - 1) * 100
+            sma_50_ratio = (close_prices / sma_50 - 1) * 100
             bb = BollingerBands(close=close_prices, window=20, window_dev=2)
             bb_high = bb.bollinger_hband()
             bb_low = bb.bollinger_lband()
             bb_mid = bb.bollinger_mavg()
-            if not bb_high.empty and not bb_low.empty:
-                bb_position = (current_price - float(bb_low.iloc[-1])) / (float(bb_high.iloc[-1]) - float(bb_low.iloc[-1]))
-                bb_width = (float(bb_high.iloc[-1]) - float(bb_low.iloc[-1])) / float(bb_mid.iloc[-1])
-            else:
-                bb_position = 0.5
-                bb_width = 0.1
-            features.append(bb_position)
-            features.append(bb_width)
-            try:
-                volume_sma_20 = volume.rolling(window=20).mean()
-                volume_ratio = float(volume.iloc[-1]) / float(volume_sma_20.iloc[-1]) if not volume_sma_20.empty else 1.0
-            except:
-                volume_ratio = 1.0
-            features.append(volume_ratio)
-            try:
-                daily_returns = close_prices.pct_change()
-                volatility = float(daily_returns.rolling(window=20).std().iloc[-1]) if len(daily_returns) >= 20 else 0.1
-            except:
-                volatility = 0.1
-            features.append(volatility)
-            if len(close_prices) >= 5:
-                momentum = (float(close_prices.iloc[-1]) / float(close_prices.iloc[-5]) - 1) * 100
-            else:
-                momentum = 0.0
-            features.append(momentum)
-            try:
-                atr = ta.volatility.average_true_range(high=high_prices, low=low_prices, close=close_prices, window=14)
-                atr_value = float(atr.iloc[-1]) / current_price * 100 if not atr.empty else 1.0
-            except:
-                atr_value = 1.0
-            features.append(atr_value)
-            normalized_features = []
-            for i, feature in enumerate(features):
-                if np.isnan(feature) or np.isinf(feature):
-                    feature = 0.0
-                if i == 0:
-                    feature = max(0, min(100, feature))
-                elif i in [4, 5, 10]:
-                    feature = max(-50, min(50, feature))
-                elif i == 8:
-                    feature = max(0.1, min(10, feature))
-                else:
-                    feature = max(-10, min(10, feature))
-                normalized_features.append(float(feature))
-            self.logger.debug(f"Generated feature vector: {len(normalized_features)} features")
-            return normalized_features
+            bb_position = (close_prices - bb_low) / (bb_high - bb_low)
+            bb_width = (bb_high - bb_low) / bb_mid
+            volume_sma_20 = volume.rolling(window=20).mean()
+            volume_ratio = (volume / volume_sma_20).where(volume_sma_20 != 0, 1.0)
+            volatility = close_prices.pct_change().rolling(window=20).std()
+            momentum = (close_prices / close_prices.shift(4) - 1) * 100
+            atr = ta.volatility.average_true_range(high=high_prices, low=low_prices, close=close_prices, window=14)
+            atr_value = atr / close_prices * 100
+            features = np.column_stack([
+                rsi.to_numpy(dtype=float),
+                macd.macd().to_numpy(dtype=float),
+                macd.macd_signal().to_numpy(dtype=float),
+                macd.macd_diff().to_numpy(dtype=float),
+                sma_20_ratio.to_numpy(dtype=float),
+                sma_50_ratio.to_numpy(dtype=float),
+                bb_position.to_numpy(dtype=float),
+                bb_width.to_numpy(dtype=float),
+                volume_ratio.to_numpy(dtype=float),
+                volatility.to_numpy(dtype=float),
+                momentum.to_numpy(dtype=float),
+                atr_value.to_numpy(dtype=float)
+            ])
+            features[~np.isfinite(features)] = 0.0
+            np.clip(features, FEATURE_LOWER_BOUNDS, FEATURE_UPPER_BOUNDS, out=features)
+            features[:49] = 0.0
+            self.logger.debug(f"Generated feature matrix: {features.shape[0]} rows x {features.shape[1]} features")
+            return features
         except Exception as e:
-            self.logger.error(f"Error calculating feature vector: {e}")
-            return [0.0] * 12
-    def generate_trading_signals(self, data: pd.DataFrame) -> Dict:
+            self.logger.error(f"Error calculating feature matrix: {e}")
+            return np.zeros((0 if data is None else len(data), 12))
+    def get_signal_indicators(self, data: pd.DataFrame) -> np.ndarray:
+        close_prices = data['Close']
+        volume = data['Volume']
+        rsi = RSIIndicator(close=close_prices, window=14).rsi().to_numpy(dtype=float)
+        macd = MACD(close=close_prices, window_fast=12, window_slow=26, window_sign=9)
+        bb = BollingerBands(close=close_prices, window=20, window_dev=2)
+        bb_upper = bb.bollinger_hband().to_numpy(dtype=float)
+        bb_lower = bb.bollinger_lband().to_numpy(dtype=float)
+        bb_range = bb_upper - bb_lower
+        with np.errstate(invalid='ignore', divide='ignore'):
+            bb_position = np.where(bb_range > 0, (close_prices.to_numpy(dtype=float) - bb_lower) / bb_range, 0.5)
+            volume_ratio = volume.to_numpy(dtype=float) / volume.rolling(window=20).mean().to_numpy(dtype=float)
+        return np.column_stack([rsi, macd.macd().to_numpy(dtype=float), macd.macd_signal().to_numpy(dtype=float),
+                                bb_position, volume_ratio])
+    def get_signal_series(self, data: pd.DataFrame, **thresholds) -> np.ndarray:
         try:
             if data is None or len(data) < 50:
-                return {
-                    'signal': 'HOLD',
-                    'strength': 0.5,
-                    'indicators': {
-                        'rsi': 50,
-                        'macd_signal': 'NEUTRAL',
-                        'bb_signal': 'NEUTRAL',
-                        'volume_signal': 'NORMAL'
-                    }
-                }
+                return np.zeros(0 if data is None else len(data), dtype=np.int8)
+            signals, _ = score_trading_signal_arrays(*self.get_signal_indicators(data).T, **thresholds)
+            signals[:49] = SIGNAL_CODES['HOLD']
+            return signals
+        except Exception as e:
+            self.logger.error(f"Error generating signal series: {e}")
+            return np.zeros(0 if data is None else len(data), dtype=np.int8)
+    def generate_trading_signals(self, data: pd.DataFrame, **thresholds) -> Dict:
+        try:
+            if data is None or len(data) < 50:
+                return default_trading_signal()
             close_prices = data['Close']
             volume = data['Volume']
             rsi = RSIIndicator(close=close_prices, window=14).rsi()
@@ -127,47 +347,8 @@ class TechnicalAnalyzer:
                 volume_ratio = float(volume.iloc[-1]) / float(volume_sma.iloc[-1]) if not volume_sma.empty else 1.0
             except:
                 volume_ratio = 1.0
-            buy_signals = 0
-            sell_signals = 0
-            if current_rsi < 30:
-                buy_signals += 2
-            elif current_rsi > 70:
-                sell_signals += 2
-            if current_macd > current_macd_signal:
-                buy_signals += 1
-            elif current_macd < current_macd_signal:
-                sell_signals += 1
-            if bb_position < 0.2:
-                buy_signals += 1
-            elif bb_position > 0.8:
-                sell_signals += 1
-            volume_signal = 'HIGH' if volume_ratio > 1.5 else ('LOW' if volume_ratio < 0.7 else 'NORMAL')
-            if volume_ratio > 1.5:
-                if buy_signals > sell_signals:
-                    buy_signals += 1
-                elif sell_signals > buy_signals:
-                    sell_signals += 1
-            if buy_signals > sell_signals + 1:
-                signal = 'BUY'
-                strength = min(0.9, 0.5 + (buy_signals - sell_signals) * 0.1)
-            elif sell_signals > buy_signals + 1:
-                signal = 'SELL' 
-                strength = min(0.9, 0.5 + (sell_signals - buy_signals) * 0.1)
-            else:
-                signal = 'HOLD'
-                strength = 0.5
-            macd_signal_str = 'BULLISH' if current_macd > current_macd_signal else ('BEARISH' if current_macd < current_macd_signal else 'NEUTRAL')
-            bb_signal_str = 'OVERSOLD' if bb_position < 0.2 else ('OVERBOUGHT' if bb_position > 0.8 else 'NEUTRAL')
-            return {
-                'signal': signal,
-                'strength': strength,
-                'indicators': {
-                    'rsi': current_rsi,
-                    'macd_signal': macd_signal_str,
-                    'bb_signal': bb_signal_str,
-                    'volume_signal': volume_signal
-                }
-            }
+            return score_trading_signals(current_rsi, current_macd, current_macd_signal, bb_position, volume_ratio,
+                                         **thresholds)
         except Exception as e:
             self.logger.error(f"Error generating trading signals: {e}")
             return {
@@ -175,6 +356,31 @@ class TechnicalAnalyzer:
                 'strength': 0.5,
                 'indicators': {'error': str(e)}
             }
+    def subscribe(self, symbol: str, exchange: str, history: Optional[pd.DataFrame] = None) -> IndicatorStream:
+        key = (symbol.upper(), exchange.upper())
+        stream = IndicatorStream(key[0], key[1])
+        bars = stream.warm_up(history)
+        self.streams[key] = stream
+        self.logger.info(f"Subscribed {key[0]} ({key[1]}) with {bars} warm-up bars")
+        return stream
+    def unsubscribe(self, symbol: str, exchange: str) -> bool:
+        return self.streams.pop((symbol.upper(), exchange.upper()), None) is not None
+    def on_bar(self, symbol: str, exchange: str, bar) -> Dict:
+        key = (symbol.upper(), exchange.upper())
+        stream = self.streams.get(key)
+        if stream is None:
+            stream = self.subscribe(symbol, exchange)
+        try:
+            return stream.update(bar)
+        except Exception as e:
+            self.logger.error(f"Error updating stream for {symbol}: {e}")
+            return {
+                'symbol': key[0],
+                'exchange': key[1],
+                'bar_count': stream.bar_count,
+                'signal': default_trading_signal(),
+                'features': [0.0] * 12
+            }
     def calculate_rsi(self, data: pd.DataFrame, period: int = 14) -> pd.Series:
         try:
             if len(data) < period:
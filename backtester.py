@@ -0,0 +1,119 @@
+import logging
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from analyser import SIGNAL_CODES, TechnicalAnalyzer
+def signal_positions(signals: np.ndarray, allow_short: bool = False) -> np.ndarray:
+    signals = np.asarray(signals)
+    exit_position = -1.0 if allow_short else 0.0
+    targets = np.where(signals == SIGNAL_CODES['BUY'], 1.0,
+                       np.where(signals == SIGNAL_CODES['SELL'], exit_position, np.nan))
+    has_target = ~np.isnan(targets)
+    last_target = np.maximum.accumulate(np.where(has_target, np.arange(len(targets)), -1))
+    return np.where(last_target >= 0, targets[np.maximum(last_target, 0)], 0.0)
+def simulate_positions(close_prices: np.ndarray, positions: np.ndarray, fee_bps: float = 10.0,
+                       slippage_bps: float = 5.0, periods_per_year: int = 252) -> Dict:
+    close_prices = np.asarray(close_prices, dtype=float)
+    positions = np.asarray(positions, dtype=float)
+    bars = len(close_prices)
+    if bars < 2:
+        raise ValueError("At least two bars are required for a backtest")
+    bar_returns = np.zeros(bars)
+    bar_returns[1:] = close_prices[1:] / close_prices[:-1] - 1
+    held = np.zeros(bars)
+    held[1:] = positions[:-1]
+    trades = np.abs(np.diff(positions, prepend=0.0))
+    costs = trades * (fee_bps + slippage_bps) / 10000
+    net_returns = held * bar_returns - costs
+    equity = np.cumprod(1 + net_returns)
+    drawdown = equity / np.maximum.accumulate(equity) - 1
+    entries = (positions != 0) & (trades != 0)
+    trade_ids = np.cumsum(entries)
+    held_ids = np.zeros(bars, dtype=trade_ids.dtype)
+    held_ids[1:] = trade_ids[:-1]
+    cost_ids = np.where(positions != 0, trade_ids, held_ids)
+    trade_log_returns = (np.bincount(held_ids, weights=np.log1p(held * bar_returns), minlength=trade_ids[-1] + 1)
+                         + np.bincount(cost_ids, weights=np.log1p(-costs), minlength=trade_ids[-1] + 1))
+    trade_returns = np.expm1(trade_log_returns[1:])
+    years = (bars - 1) / periods_per_year
+    total_return = equity[-1] - 1
+    volatility = net_returns[1:].std() * np.sqrt(periods_per_year)
+    return {
+        'bars': bars,
+        'total_return': float(total_return),
+        'annualized_return': float(equity[-1] ** (1 / years) - 1) if years > 0 and equity[-1] > 0 else float(total_return),
+        'volatility': float(volatility),
+        'sharpe_ratio': float(net_returns[1:].mean() / net_returns[1:].std() * np.sqrt(periods_per_year)) if volatility > 0 else 0.0,
+        'max_drawdown': float(drawdown.min()),
+        'trades': int(len(trade_returns)),
+        'hit_rate': float((trade_returns > 0).mean()) if len(trade_returns) else 0.0,
+        'turnover': float(trades.sum()),
+        'annual_turnover': float(trades.sum() / years) if years > 0 else float(trades.sum()),
+        'exposure': float((held != 0).mean()),
+        'fees_paid': float(costs.sum()),
+        'buy_and_hold_return': float(close_prices[-1] / close_prices[0] - 1),
+        'equity_curve': equity,
+        'drawdown_curve': drawdown
+    }
+class Backtester:
+    def __init__(self, data_fetcher=None, technical_analyzer: Optional[TechnicalAnalyzer] = None,
+                 fee_bps: float = 10.0, slippage_bps: float = 5.0, allow_short: bool = False,
+                 periods_per_year: int = 252):
+        self.logger = logging.getLogger(__name__)
+        self.data_fetcher = data_fetcher
+        self.technical_analyzer = technical_analyzer or TechnicalAnalyzer()
+        self.fee_bps = fee_bps
+        self.slippage_bps = slippage_bps
+        self.allow_short = allow_short
+        self.periods_per_year = periods_per_year
+    def neural_network_signals(self, neural_network, data: pd.DataFrame) -> np.ndarray:
+        feature_matrix = self.technical_analyzer.get_feature_matrix(data)
+        signals = np.zeros(len(data), dtype=np.int8)
+        if len(feature_matrix) < 50:
+            return signals
+        predictions = neural_network.predict_batch(feature_matrix[49:])
+        signals[49:] = [SIGNAL_CODES.get(prediction['prediction'], 0) for prediction in predictions]
+        return signals
+    def run(self, data: pd.DataFrame, signals: Optional[np.ndarray] = None) -> Dict:
+        if data is None or len(data) < 50:
+            raise ValueError("At least 50 bars are required for a backtest")
+        if signals is None:
+            signals = self.technical_analyzer.get_signal_series(data)
+        positions = signal_positions(signals, self.allow_short)
+        result = simulate_positions(data['Close'].to_numpy(dtype=float), positions, self.fee_bps,
+                                    self.slippage_bps, self.periods_per_year)
+        result['start'] = data.index[0]
+        result['end'] = data.index[-1]
+        result['signal_counts'] = {name: int((signals == code).sum()) for name, code in SIGNAL_CODES.items()}
+        return result
+    def run_many(self, symbols: List[str], exchange: str, period: str = '5y', interval: str = '1d',
+                 neural_network=None) -> Dict:
+        if self.data_fetcher is None:
+            raise ValueError("A data fetcher is required to backtest symbols")
+        results = {}
+        errors = {}
+        batch = self.data_fetcher.get_stock_data_many(symbols, exchange, period=period, interval=interval)
+        for symbol, fetched in batch.items():
+            data = fetched['data']
+            if data is None:
+                errors[symbol] = fetched['error'] or 'No data'
+                continue
+            try:
+                signals = self.neural_network_signals(neural_network, data) if neural_network is not None else None
+                results[symbol] = self.run(data, signals)
+            except Exception as e:
+                self.logger.warning(f"Backtest failed for {symbol} ({exchange}): {e}")
+                errors[symbol] = str(e)
+        return {'results': results, 'errors': errors, 'summary': self.summarize(results)}
+    def summarize(self, results: Dict[str, Dict]) -> Dict:
+        if not results:
+            return {'symbols': 0}
+        columns = ['total_return', 'annualized_return', 'sharpe_ratio', 'max_drawdown', 'hit_rate',
+                   'annual_turnover', 'buy_and_hold_return']
+        table = pd.DataFrame.from_dict({symbol: {column: result[column] for column in columns}
+                                        for symbol, result in results.items()}, orient='index')
+        summary = {'symbols': len(table), 'symbol_years': float(sum(r['bars'] - 1 for r in results.values()) / self.periods_per_year)}
+        summary.update({f'mean_{column}': float(table[column].mean()) for column in columns})
+        summary['worst_drawdown'] = float(table['max_drawdown'].min())
+        summary['table'] = table.sort_values('sharpe_ratio', ascending=False)
+        return summary
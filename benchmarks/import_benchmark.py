@@ -0,0 +1,48 @@
+import json
+import os
+import subprocess
+import sys
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = {
+    'lazy': [],
+    'eager': ['tensorflow', 'sklearn.preprocessing', 'sklearn.model_selection', 'sklearn.metrics', 'joblib']
+}
+PROBE = '''
+import importlib, json, resource, sys, time
+start = time.perf_counter()
+for name in sys.argv[1:]:
+    importlib.import_module(name)
+import neuralnetwork
+network = neuralnetwork.TradingNeuralNetwork()
+network.get_model_info()
+network.predict([0.0] * 12)
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    'seconds': elapsed,
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'tensorflow_loaded': 'tensorflow' in sys.modules,
+    'sklearn_loaded': 'sklearn' in sys.modules
+}))
+'''
+def run_scenario(modules, repeats: int = 3) -> dict:
+    runs = []
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE] + modules,
+            cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    best = min(runs, key=lambda run: run['seconds'])
+    return best
+def main():
+    print(f"{'scenario':<10}{'seconds':>10}{'max_rss_mb':>12}{'tensorflow':>12}{'sklearn':>10}")
+    for name, modules in SCENARIOS.items():
+        try:
+            result = run_scenario(modules)
+        except subprocess.CalledProcessError as e:
+            print(f"{name:<10} failed: {e.stderr.strip().splitlines()[-1] if e.stderr else e}")
+            continue
+        print(f"{name:<10}{result['seconds']:>10.3f}{result['max_rss_mb']:>12.1f}"
+              f"{str(result['tensorflow_loaded']):>12}{str(result['sklearn_loaded']):>10}")
+if __name__ == '__main__':
+    main()
@@ -2,61 +2,348 @@ import logging
 import yfinance as yf
 from datetime import datetime, timedelta
 import pandas as pd
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 import requests
 from pytz import timezone
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from ohlcv_store import OHLCVStore
+class DataCache:
+    INTERVAL_TTLS = {
+        '1m': 60,
+        '2m': 120,
+        '5m': 300,
+        '15m': 600,
+        '30m': 900,
+        '60m': 1800,
+        '90m': 1800,
+        '1h': 1800,
+        '1d': 300,
+        '5d': 21600,
+        '1wk': 21600,
+        '1mo': 21600,
+        '3mo': 21600
+    }
+    def __init__(self, max_entries: int = 4096, max_bytes: int = 256 * 1024 * 1024, default_ttl: float = 300):
+        self.logger = logging.getLogger(__name__)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    def ttl_for(self, interval: Optional[str]) -> float:
+        return self.INTERVAL_TTLS.get(interval, self.default_ttl)
+    def _size_of(self, value) -> int:
+        try:
+            if isinstance(value, pd.DataFrame):
+                return int(value.memory_usage(deep=True).sum())
+        except Exception:
+            pass
+        return 0
+    def _discard(self, key: str):
+        _, nbytes, _ = self._entries.pop(key)
+        self.current_bytes -= nbytes
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, _, value = entry
+            if time.time() >= expires_at:
+                self._discard(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    def peek(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() >= entry[0]:
+                return None
+            return entry[2]
+    def set(self, key: str, value, interval: Optional[str] = None, ttl: Optional[float] = None):
+        nbytes = self._size_of(value)
+        if nbytes > self.max_bytes:
+            self.logger.debug(f"Not caching {key}: {nbytes} bytes exceeds cache budget")
+            return
+        expires_at = time.time() + (ttl if ttl is not None else self.ttl_for(interval))
+        with self._lock:
+            if key in self._entries:
+                self._discard(key)
+            self._entries[key] = (expires_at, nbytes, value)
+            self.current_bytes += nbytes
+            while self._entries and (len(self._entries) > self.max_entries or self.current_bytes > self.max_bytes):
+                oldest_key = next(iter(self._entries))
+                self._discard(oldest_key)
+                self.evictions += 1
+    def invalidate(self, key: str) -> bool:
+        with self._lock:
+            if key in self._entries:
+                self._discard(key)
+                return True
+            return False
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [key for key, (expires_at, _, _) in self._entries.items() if now >= expires_at]
+            for key in expired:
+                self._discard(key)
+            self.expirations += len(expired)
+            return len(expired)
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+    def get_stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and time.time() < entry[0]
 class DataFetcher:
-    def __init__(self):
+    EXCHANGE_SUFFIXES = {
+        'NASDAQ': '',
+        'NSE': '.NS',
+        'HKEX': '.HK'
+    }
+    INTRADAY_QUOTE_SOURCES = [('1d', '1m'), ('5d', '1m'), ('1d', '5m'), ('5d', '5m')]
+    def __init__(self, provider: Optional[Callable[..., pd.DataFrame]] = None,
+                 max_workers: int = 16, max_workers_per_exchange: int = 4, cache: Optional[DataCache] = None,
+                 store: Optional[OHLCVStore] = None, store_dir: Optional[str] = 'data/ohlcv', offline: bool = False,
+                 quote_provider: Optional[Callable[[str], float]] = None, quote_ttl: float = 15):
         self.logger = logging.getLogger(__name__)
-        self.cache = {}
         self.cache_duration = 300
+        self.cache = cache if cache is not None else DataCache(default_ttl=self.cache_duration)
+        self.store = store if store is not None else (OHLCVStore(store_dir) if store_dir else None)
+        self.offline = offline
+        self.provider = provider or self._yfinance_provider
+        self.quote_provider = quote_provider or self._yfinance_quote_provider
+        self.quote_cache = DataCache(max_entries=8192, default_ttl=quote_ttl)
+        self.max_workers = max_workers
+        self.max_workers_per_exchange = max_workers_per_exchange
+        self._exchange_semaphores = {}
+        self._semaphores_lock = threading.Lock()
         self.logger.info("Real Data Fetcher initialized with yfinance")
+    def _yfinance_provider(self, ticker_symbol: str, period: str, interval: str,
+                           start: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        ticker = yf.Ticker(ticker_symbol)
+        if start is not None:
+            return ticker.history(start=start, interval=interval)
+        return ticker.history(period=period, interval=interval)
+    def _yfinance_quote_provider(self, ticker_symbol: str) -> float:
+        return float(yf.Ticker(ticker_symbol).fast_info['last_price'])
+    def _ticker_symbol(self, symbol: str, exchange: str) -> str:
+        return f"{symbol}{self.EXCHANGE_SUFFIXES.get(exchange, '')}"
+    def _get_exchange_semaphore(self, exchange: str) -> threading.BoundedSemaphore:
+        with self._semaphores_lock:
+            if exchange not in self._exchange_semaphores:
+                self._exchange_semaphores[exchange] = threading.BoundedSemaphore(self.max_workers_per_exchange)
+            return self._exchange_semaphores[exchange]
+    def _load_stock_data(self, symbol: str, exchange: str, period: str, interval: str) -> pd.DataFrame:
+        from config import config
+        ticker_symbol = self._ticker_symbol(symbol, exchange)
+        cache_key = f"{ticker_symbol}_{period}_{interval}"
+        cached_data = self.cache.get(cache_key)
+        if cached_data is not None:
+            self.logger.info(f"Using cached data for {ticker_symbol}")
+            return cached_data
+        if self.store is not None:
+            data = self._load_from_store(ticker_symbol, period, interval, symbol, exchange)
+        elif self.offline:
+            raise ValueError(f"No data found for {ticker_symbol} (offline without a store)")
+        else:
+            self.logger.info(f"Fetching real data for {ticker_symbol}")
+            data = self.provider(ticker_symbol, period, interval)
+        if data is None or data.empty:
+            raise ValueError(f"No data found for {ticker_symbol}")
+        data = data.dropna()
+        if len(data) < 20:
+            raise ValueError(f"Insufficient data for {ticker_symbol} (only {len(data)} records)")
+        self.cache.set(cache_key, data, interval=interval)
+        self.logger.info(f"Successfully fetched {len(data)} records for {ticker_symbol}")
+        return data
+    def _load_from_store(self, ticker_symbol: str, period: str, interval: str, symbol: Optional[str] = None,
+                         exchange: Optional[str] = None) -> Optional[pd.DataFrame]:
+        stored = self.store.read(ticker_symbol, interval)
+        if self.offline:
+            if stored is None:
+                raise ValueError(f"No stored data for {ticker_symbol} ({interval})")
+            self.logger.info(f"Using stored data for {ticker_symbol}")
+            return self.store.slice_period(stored, period)
+        fetched = None
+        refreshed = False
+        if self.store.covers(stored, period):
+            last_timestamp = stored.index[-1]
+            self.logger.info(f"Refreshing stored data for {ticker_symbol} from {last_timestamp}")
+            try:
+                fetched = self.provider(ticker_symbol, period, interval, start=last_timestamp)
+                refreshed = True
+            except Exception as e:
+                self.logger.warning(f"Incremental refresh failed for {ticker_symbol}: {e}")
+        if not refreshed:
+            self.logger.info(f"Fetching real data for {ticker_symbol}")
+            fetched = self.provider(ticker_symbol, period, interval)
+        if fetched is not None and not fetched.empty:
+            self.store.append(ticker_symbol, interval, fetched, symbol=symbol, exchange=exchange)
+            stored = self.store.read(ticker_symbol, interval)
+        if stored is None:
+            return fetched
+        return self.store.slice_period(stored, period)
     def get_stock_data(self, symbol: str, exchange: str, period: str = '3mo', interval: str = '1d') -> Optional[pd.DataFrame]:
         try:
-            from config import config
-            exchange_suffixes = {
-                'NASDAQ': '',
-                'NSE': '.NS', 
-                'HKEX': '.HK'
-            }
-            suffix = exchange_suffixes.get(exchange, '')
-            ticker_symbol = f"{symbol}{suffix}"
-            cache_key = f"{ticker_symbol}_{period}_{interval}"
-            current_time = time.time()
-            if cache_key in self.cache:
-                cached_time, cached_data = self.cache[cache_key]
-                if current_time - cached_time < self.cache_duration:
-                    self.logger.info(f"Using cached data for {ticker_symbol}")
-                    return cached_data
-            self.logger.info(f"Fetching real data for {ticker_symbol}")
-            ticker = yf.Ticker(ticker_symbol)
-            data = ticker.history(period=period, interval=interval)
-            if data.empty:
-                self.logger.warning(f"No data found for {ticker_symbol}")
-                return None
-            data = data.dropna()
-            if len(data) < 20:
-                self.logger.warning(f"Insufficient data for {ticker_symbol} (only {len(data)} records)")
-                return None
-            self.cache[cache_key] = (current_time, data)
-            self.logger.info(f"Successfully fetched {len(data)} records for {ticker_symbol}")
-            return data
+            return self._load_stock_data(symbol, exchange, period, interval)
+        except ValueError as e:
+            self.logger.warning(str(e))
+            return None
         except Exception as e:
             self.logger.error(f"Error fetching data for {symbol} on {exchange}: {e}")
             return None
-    def get_current_price(self, symbol: str, exchange: str) -> float:
+    def get_stored_history(self, symbol: str, exchange: str, interval: str = '1d') -> Optional[pd.DataFrame]:
+        if self.store is None:
+            return None
         try:
-            data = self.get_stock_data(symbol, exchange, period='1d', interval='1m')
+            data = self.store.read(self._ticker_symbol(symbol, exchange), interval)
+            return data.dropna() if data is not None else None
+        except Exception as e:
+            self.logger.warning(f"Could not read stored history for {symbol} on {exchange}: {e}")
+            return None
+    def _fetch_symbol(self, symbol: str, exchange: str, periods: List[str], interval: str, min_records: int) -> Dict:
+        data = None
+        error = None
+        with self._get_exchange_semaphore(exchange):
+            for period in periods:
+                try:
+                    data = self._load_stock_data(symbol, exchange, period, interval)
+                    error = None
+                    if len(data) >= min_records:
+                        break
+                except Exception as e:
+                    error = str(e)
+        return {'data': data, 'error': error if data is None else None}
+    def get_stock_data_many(self, symbols: List[str], exchange: str, period: str = '3mo', interval: str = '1d',
+                            fallback_periods: Optional[List[str]] = None, min_records: int = 0) -> Dict[str, Dict]:
+        periods = [period] + list(fallback_periods or [])
+        results = {symbol: {'data': None, 'error': None} for symbol in symbols}
+        pending = []
+        for symbol in results:
+            cache_key = f"{self._ticker_symbol(symbol, exchange)}_{period}_{interval}"
+            cached_data = self.cache.peek(cache_key)
+            if cached_data is not None and len(cached_data) >= min_records:
+                self.cache.get(cache_key)
+                results[symbol] = {'data': cached_data, 'error': None}
+            else:
+                pending.append(symbol)
+        if not pending:
+            return results
+        workers = max(1, min(self.max_workers, len(pending)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(self._fetch_symbol, symbol, exchange, periods, interval, min_records): symbol
+                for symbol in pending
+            }
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    results[symbol] = future.result()
+                except Exception as e:
+                    results[symbol] = {'data': None, 'error': str(e)}
+                if results[symbol]['error']:
+                    self.logger.debug(f"Error getting data for {symbol} on {exchange}: {results[symbol]['error']}")
+        return results
+    def _cached_intraday_price(self, ticker_symbol: str) -> Optional[float]:
+        for period, interval in self.INTRADAY_QUOTE_SOURCES:
+            data = self.cache.peek(f"{ticker_symbol}_{period}_{interval}")
             if data is not None and not data.empty:
                 return float(data['Close'].iloc[-1])
+        return None
+    def _fetch_quote(self, symbol: str, exchange: str) -> float:
+        ticker_symbol = self._ticker_symbol(symbol, exchange)
+        price = self._cached_intraday_price(ticker_symbol)
+        if price is None and not self.offline:
+            try:
+                with self._get_exchange_semaphore(exchange):
+                    price = self.quote_provider(ticker_symbol)
+            except Exception as e:
+                self.logger.debug(f"Quote lookup failed for {ticker_symbol}: {e}")
+                price = None
+        if price is None or not price > 0:
             data = self.get_stock_data(symbol, exchange, period='5d', interval='1d')
-            if data is not None and not data.empty:
-                return float(data['Close'].iloc[-1])
-            return 0.0
+            price = float(data['Close'].iloc[-1]) if data is not None and not data.empty else 0.0
+        if price > 0:
+            self.quote_cache.set(ticker_symbol, price)
+        return price
+    def get_current_price(self, symbol: str, exchange: str) -> float:
+        try:
+            cached_price = self.quote_cache.get(self._ticker_symbol(symbol, exchange))
+            if cached_price is not None:
+                return cached_price
+            return self._fetch_quote(symbol, exchange)
         except Exception as e:
             self.logger.error(f"Error getting current price for {symbol}: {e}")
             return 0.0
+    def get_current_prices(self, positions: List[Tuple[str, str]]) -> Dict[Tuple[str, str], float]:
+        prices = {}
+        missing = []
+        for symbol, exchange in dict.fromkeys(positions):
+            cached_price = self.quote_cache.get(self._ticker_symbol(symbol, exchange))
+            if cached_price is not None:
+                prices[(symbol, exchange)] = cached_price
+            else:
+                missing.append((symbol, exchange))
+        if not missing:
+            return prices
+        workers = max(1, min(self.max_workers, len(missing)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(self._fetch_quote, symbol, exchange): (symbol, exchange) for symbol, exchange in missing}
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    prices[key] = future.result()
+                except Exception as e:
+                    self.logger.error(f"Error getting current price for {key[0]}: {e}")
+                    prices[key] = 0.0
+        return prices
+    def get_previous_closes(self, positions: List[Tuple[str, str]]) -> Dict[Tuple[str, str], float]:
+        by_exchange = {}
+        for symbol, exchange in dict.fromkeys(positions):
+            by_exchange.setdefault(exchange, []).append(symbol)
+        previous_closes = {}
+        for exchange, symbols in by_exchange.items():
+            batch = self.get_stock_data_many(symbols, exchange, period='3mo', interval='1d')
+            for symbol, result in batch.items():
+                data = result['data']
+                if data is not None and len(data) >= 2:
+                    previous_closes[(symbol, exchange)] = float(data['Close'].iloc[-2])
+                else:
+                    previous_closes[(symbol, exchange)] = 0.0
+        return previous_closes
+    def get_cache_stats(self) -> Dict:
+        return self.cache.get_stats()
     def is_market_open(self, exchange: str) -> bool:
         try:
             from config import config
@@ -74,48 +361,29 @@ class DataFetcher:
         except Exception as e:
             self.logger.error(f"Error checking market status for {exchange}: {e}")
             return False
-    def get_market_movers(self, exchange: str, limit: int = 10) -> List[Dict]:
+    def get_exchange_symbols(self, exchange: str, interval: str = '1d') -> List[str]:
+        from config import config
+        symbols = list(config.POPULAR_STOCKS.get(exchange, []))
+        if self.store is not None:
+            symbols.extend(self.store.exchange_symbols(interval, exchange))
+        return list(dict.fromkeys(symbols))
+    def get_market_movers(self, exchange: str, limit: int = 10, symbols: Optional[List[str]] = None) -> List[Dict]:
         try:
-            from config import config
-            symbols = config.POPULAR_STOCKS.get(exchange, [])
-            movers = []
-            for symbol in symbols[:limit * 2]:
-                try:
-                    data = None
-                    for period in ['5d', '1wk', '1mo']:
-                        try:
-                            data = self.get_stock_data(symbol, exchange, period=period, interval='1d')
-                            if data is not None and len(data) >= 5:
-                                break
-                        except:
-                            continue
-                    if data is None or len(data) < 2:
-                        self.logger.debug(f"Insufficient data for {symbol}, skipping")
-                        continue
-                    current_price = float(data['Close'].iloc[-1])
-                    if len(data) >= 5:
-                        previous_price = float(data['Close'].iloc[-5])
-                    else:
-                        previous_price = float(data['Close'].iloc[-2])
-                    change = current_price - previous_price
-                    change_percent = (change / previous_price) * 100 if previous_price > 0 else 0
-                    volume = int(data['Volume'].iloc[-1]) if 'Volume' in data.columns else 1000000
-                    movers.append({
-                        'symbol': symbol,
-                        'price': round(current_price, 2),
-                        'change': round(change, 2),
-                        'change_percent': round(change_percent, 2),
-                        'volume': volume
-                    })
-                    self.logger.debug(f"Added {symbol}: {current_price} ({change_percent:.1f}%)")
-                except Exception as e:
-                    self.logger.debug(f"Error getting data for {symbol}: {e}")
-                    continue
-            if not movers:
+            from screener import MarketScreener
+            screener = MarketScreener(self, period='1mo')
+            metrics = screener.screen(exchange, symbols, fallback_periods=['3mo'], min_records=5)
+            if not len(metrics['symbols']):
                 self.logger.info(f"No market data available for {exchange}, using fallback")
                 return self._generate_fallback_movers(exchange, limit)
-            movers.sort(key=lambda x: abs(x['change_percent']), reverse=True)
-            return movers[:limit]
+            movers = screener.top(metrics, 'period_change_percent', limit, absolute=True,
+                                  fields=['price', 'period_change', 'period_change_percent', 'volume'])
+            return [{
+                'symbol': mover['symbol'],
+                'price': mover['price'],
+                'change': mover['period_change'],
+                'change_percent': mover['period_change_percent'],
+                'volume': mover['volume']
+            } for mover in movers]
         except Exception as e:
             self.logger.error(f"Error getting market movers for {exchange}: {e}")
             return self._generate_fallback_movers(exchange, limit)
@@ -138,55 +406,16 @@ class DataFetcher:
             })
         movers.sort(key=lambda x: abs(x['change_percent']), reverse=True)
         return movers
-    def get_high_volume_stocks(self, exchange: str, limit: int = 10) -> List[Dict]:
+    def get_high_volume_stocks(self, exchange: str, limit: int = 10, symbols: Optional[List[str]] = None) -> List[Dict]:
         try:
-            from config import config
-            symbols = config.POPULAR_STOCKS.get(exchange, [])
-            high_volume = []
-            for symbol in symbols[:limit * 2]:
-                try:
-                    data = None
-                    for period in ['5d', '1wk', '1mo']:
-                        try:
-                            data = self.get_stock_data(symbol, exchange, period=period, interval='1d')
-                            if data is not None and len(data) >= 3:
-                                break
-                        except:
-                            continue
-                    if data is None or len(data) < 1:
-                        self.logger.debug(f"No volume data for {symbol}, skipping")
-                        continue
-                    current_price = float(data['Close'].iloc[-1])
-                    volume = int(data['Volume'].iloc[-1]) if 'Volume' in data.columns else 1000000
-                    if len(data) > 3:
-                        avg_volume = data['Volume'].mean() if 'Volume' in data.columns else 500000
-                        volume_ratio = volume / avg_volume if avg_volume > 0 else 1
-                    else:
-                        volume_ratio = 1.5
-                    if len(data) >= 2:
-                        previous_price = float(data['Close'].iloc[-2])
-                        change = current_price - previous_price
-                        change_percent = (change / previous_price) * 100 if previous_price > 0 else 0
-                    else:
-                        change = 0
-                        change_percent = 0
-                    high_volume.append({
-                        'symbol': symbol,
-                        'price': round(current_price, 2),
-                        'change': round(change, 2),
-                        'change_percent': round(change_percent, 2),
-                        'volume': volume,
-                        'volume_ratio': round(volume_ratio, 2)
-                    })
-                    self.logger.debug(f"Added {symbol}: volume {volume} (ratio: {volume_ratio:.1f})")
-                except Exception as e:
-                    self.logger.debug(f"Error getting volume data for {symbol}: {e}")
-                    continue
-            if not high_volume:
+            from screener import MarketScreener
+            screener = MarketScreener(self, period='1mo')
+            metrics = screener.screen(exchange, symbols, fallback_periods=['3mo'], min_records=3)
+            if not len(metrics['symbols']):
                 self.logger.info(f"No volume data available for {exchange}, using fallback")
                 return self._generate_fallback_volume(exchange, limit)
-            high_volume.sort(key=lambda x: x['volume'], reverse=True)
-            return high_volume[:limit]
+            return screener.top(metrics, 'volume', limit,
+                                fields=['price', 'change', 'change_percent', 'volume', 'volume_ratio'])
         except Exception as e:
             self.logger.error(f"Error getting high volume stocks for {exchange}: {e}")
             return self._generate_fallback_volume(exchange, limit)
@@ -1,34 +1,120 @@
 import logging
-from typing import Dict, List, Any, Tuple
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 import numpy as np
-import pandas as pd
-import tensorflow as tf
-from tensorflow import keras
-from tensorflow.keras import layers
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report, confusion_matrix
-import joblib
 import os
 import warnings
+from numpy_inference import NumpyTradingModel, export_numpy_model, read_model_metadata
 warnings.filterwarnings('ignore')
+LABEL_HORIZON = 5
+LABEL_THRESHOLD = 3.0
+FEATURE_WARMUP = 50
+_worker_analyzer = None
+_worker_dataset_stores = {}
+def _keras():
+    from tensorflow import keras
+    return keras
+def label_feature_rows(feature_matrix: np.ndarray, close_prices: np.ndarray, start: int = FEATURE_WARMUP,
+                       horizon: int = LABEL_HORIZON, threshold: float = LABEL_THRESHOLD) -> Tuple[np.ndarray, np.ndarray]:
+    end = len(close_prices) - horizon
+    if end <= start:
+        return np.empty((0, 12)), np.empty(0, dtype='<U4')
+    current_prices = close_prices[start:end]
+    future_prices = close_prices[start + horizon:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return_pct = (future_prices - current_prices) / current_prices * 100
+    valid = np.isfinite(return_pct)
+    labels = np.where(return_pct > threshold, 'BUY', np.where(return_pct < -threshold, 'SELL', 'HOLD'))
+    return np.asarray(feature_matrix[start:end])[valid], labels[valid]
+def bar_timestamps(data) -> np.ndarray:
+    return data.index.as_unit('ns').asi8.astype(np.int64)
+def training_history(window, history=None):
+    if history is None or history.empty or history.index[0] > window.index[0]:
+        return window
+    history = history[history.index <= window.index[-1]]
+    return history if window.index[0] in history.index else window
+def build_training_arrays(data, technical_analyzer, horizon: int = LABEL_HORIZON,
+                          threshold: float = LABEL_THRESHOLD, window_start: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    feature_matrix = technical_analyzer.get_feature_matrix(data)
+    if feature_matrix.shape != (len(data), 12):
+        raise ValueError("Feature calculation failed")
+    close_prices = data['Close'].to_numpy(dtype=float)
+    return label_feature_rows(feature_matrix, close_prices, max(FEATURE_WARMUP, window_start), horizon, threshold)
+def build_symbol_training_arrays(task: Tuple[str, str, Any, Optional[int]], technical_analyzer=None,
+                                 dataset_dir: Optional[str] = None) -> Dict[str, Any]:
+    global _worker_analyzer
+    symbol, exchange, data, window_start = task
+    try:
+        if technical_analyzer is None:
+            if _worker_analyzer is None:
+                from analyser import TechnicalAnalyzer
+                _worker_analyzer = TechnicalAnalyzer()
+            technical_analyzer = _worker_analyzer
+        if dataset_dir:
+            if dataset_dir not in _worker_dataset_stores:
+                from training_dataset import TrainingDatasetStore
+                _worker_dataset_stores[dataset_dir] = TrainingDatasetStore(dataset_dir, technical_analyzer)
+            timestamps, feature_matrix, close_prices = _worker_dataset_stores[dataset_dir].update(symbol, exchange, data)
+            start = int(np.searchsorted(timestamps, window_start)) if window_start is not None else 0
+            features, labels = label_feature_rows(feature_matrix, close_prices, max(FEATURE_WARMUP, start))
+        else:
+            start = int(np.searchsorted(bar_timestamps(data), window_start)) if window_start is not None else 0
+            features, labels = build_training_arrays(data, technical_analyzer, window_start=start)
+        return {'symbol': symbol, 'exchange': exchange, 'features': features, 'labels': labels, 'error': None}
+    except Exception as e:
+        return {'symbol': symbol, 'exchange': exchange, 'features': np.empty((0, 12)),
+                'labels': np.empty(0, dtype='<U4'), 'error': str(e)}
 class TradingNeuralNetwork:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self.model = None
-        self.scaler = StandardScaler()
-        self.label_encoder = LabelEncoder()
+        self.numpy_model = None
+        self.scaler = None
+        self.label_encoder = None
         self.is_trained = False
         self.feature_names = []
+        self.training_report = []
+        self._feature_cache = OrderedDict()
+        self.feature_cache_size = 4096
         self.models_dir = 'models'
         os.makedirs(self.models_dir, exist_ok=True)
         self.model_path = os.path.join(self.models_dir, 'trading_model.keras')
         self.scaler_path = os.path.join(self.models_dir, 'scaler.pkl')
         self.encoder_path = os.path.join(self.models_dir, 'label_encoder.pkl')
-        self.load_model()
+        self.numpy_model_path = os.path.join(self.models_dir, 'trading_model.npz')
+        self.dataset_dir = os.path.join('data', 'training')
+        self.is_trained = self._load_saved_model()
         self.logger.info(f"Real Neural Network initialized. Trained: {self.is_trained}")
-    def _create_model(self, input_dim: int) -> keras.Model:
+    def _saved_model_exists(self) -> bool:
+        return (os.path.exists(self.model_path) and
+                os.path.exists(self.scaler_path) and
+                os.path.exists(self.encoder_path))
+    def _numpy_model_is_current(self) -> bool:
+        if not os.path.exists(self.numpy_model_path):
+            return False
+        return (not os.path.exists(self.model_path) or
+                os.path.getmtime(self.numpy_model_path) >= os.path.getmtime(self.model_path))
+    def _load_saved_model(self) -> bool:
+        if self._numpy_model_is_current():
+            numpy_model = NumpyTradingModel(self.numpy_model_path)
+            if numpy_model.is_trained:
+                self.numpy_model = numpy_model
+                return True
+        return self.load_model()
+    def _inference_engine(self):
+        if self.model is not None:
+            return self
+        if self.numpy_model is None and self._numpy_model_is_current():
+            numpy_model = NumpyTradingModel(self.numpy_model_path)
+            if numpy_model.is_trained:
+                self.numpy_model = numpy_model
+        if self.numpy_model is not None:
+            return self.numpy_model
+        return self if self.load_model() else None
+    def _create_model(self, input_dim: int):
+        keras = _keras()
+        layers = keras.layers
         model = keras.Sequential([
             layers.Input(shape=(input_dim,)),
             layers.Dense(128, activation='relu'),
@@ -50,66 +136,78 @@ class TradingNeuralNetwork:
             metrics=['accuracy', 'precision', 'recall']
         )
         return model
-    def prepare_training_data(self, data_fetcher, technical_analyzer, max_stocks: int = 20) -> Tuple[np.ndarray, np.ndarray]:
+    def prepare_training_data(self, data_fetcher, technical_analyzer, max_stocks: int = 20,
+                              max_workers: Optional[int] = None, use_dataset_cache: bool = True) -> Tuple[np.ndarray, np.ndarray]:
         self.logger.info("Preparing training data from real stock market data...")
-        all_features = []
-        all_labels = []
         from config import config
-        stocks_processed = 0
+        tasks = []
         for exchange, symbols in config.POPULAR_STOCKS.items():
-            if stocks_processed >= max_stocks:
+            if len(tasks) >= max_stocks:
                 break
             self.logger.info(f"Processing stocks from {exchange}")
-            symbols_to_process = symbols[:max(1, (max_stocks - stocks_processed) // len(config.POPULAR_STOCKS))]
-            for symbol in symbols_to_process:
-                if stocks_processed >= max_stocks:
+            symbols_to_process = symbols[:max(1, (max_stocks - len(tasks)) // len(config.POPULAR_STOCKS))]
+            batch = data_fetcher.get_stock_data_many(symbols_to_process, exchange, period='6mo', interval='1d')
+            for symbol, result in batch.items():
+                if len(tasks) >= max_stocks:
                     break
-                try:
-                    self.logger.info(f"Processing {symbol} ({exchange})...")
-                    data = data_fetcher.get_stock_data(symbol, exchange, period='6mo', interval='1d')
-                    if data is None or len(data) < 60:
-                        self.logger.warning(f"Insufficient data for {symbol}, skipping")
-                        continue
-                    samples_generated = 0
-                    for i in range(50, len(data) - 5):
-                        try:
-                            current_data = data.iloc[:i+1]
-                            features = technical_analyzer.get_feature_vector(current_data)
-                            if len(features) != 12:
-                                continue
-                            current_price = float(data['Close'].iloc[i])
-                            future_price = float(data['Close'].iloc[i+5])
-                            return_pct = (future_price - current_price) / current_price * 100
-                            if return_pct > 3:
-                                label = 'BUY'
-                            elif return_pct < -3:
-                                label = 'SELL'
-                            else:
-                                label = 'HOLD'
-                            all_features.append(features)
-                            all_labels.append(label)
-                            samples_generated += 1
-                        except Exception as e:
-                            continue
-                    self.logger.info(f"Generated {samples_generated} samples from {symbol}")
-                    stocks_processed += 1
-                except Exception as e:
-                    self.logger.error(f"Error processing {symbol}: {e}")
+                data = result['data']
+                if data is None or len(data) < 60:
+                    self.logger.warning(f"Insufficient data for {symbol}, skipping")
                     continue
-        if not all_features:
+                history = training_history(data, data_fetcher.get_stored_history(symbol, exchange))
+                tasks.append((symbol, exchange, history, int(bar_timestamps(data)[0])))
+        dataset_dir = self.dataset_dir if use_dataset_cache else None
+        results = self._build_training_arrays_parallel(tasks, technical_analyzer, max_workers, dataset_dir)
+        self.training_report = []
+        all_features = []
+        all_labels = []
+        for result in results:
+            self.training_report.append({
+                'symbol': result['symbol'],
+                'exchange': result['exchange'],
+                'samples': len(result['labels']),
+                'error': result['error']
+            })
+            if result['error']:
+                self.logger.error(f"Error processing {result['symbol']}: {result['error']}")
+                continue
+            self.logger.info(f"Generated {len(result['labels'])} samples from {result['symbol']}")
+            all_features.append(result['features'])
+            all_labels.append(result['labels'])
+        stocks_processed = len(all_features)
+        if not all_features or not sum(len(labels) for labels in all_labels):
             raise ValueError("No training data could be generated")
-        X = np.array(all_features)
-        y = np.array(all_labels)
+        X = np.concatenate(all_features)
+        y = np.concatenate(all_labels)
         self.logger.info(f"Prepared {len(X)} training samples from {stocks_processed} stocks")
         return X, y
+    def _build_training_arrays_parallel(self, tasks: List[Tuple[str, str, Any, Optional[int]]], technical_analyzer,
+                                        max_workers: Optional[int] = None,
+                                        dataset_dir: Optional[str] = None) -> List[Dict[str, Any]]:
+        workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+        if workers <= 1:
+            return [build_symbol_training_arrays(task, technical_analyzer, dataset_dir) for task in tasks]
+        from concurrent.futures import ProcessPoolExecutor
+        from functools import partial
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(partial(build_symbol_training_arrays, dataset_dir=dataset_dir), tasks))
+        except Exception as e:
+            self.logger.warning(f"Process pool unavailable ({e}), building training data serially")
+            return [build_symbol_training_arrays(task, technical_analyzer, dataset_dir) for task in tasks]
     def get_model_info(self) -> Dict[str, Any]:
         info = {
             'is_trained': self.is_trained,
-            'model_exists': self.model is not None,
+            'model_exists': self.model is not None or os.path.exists(self.model_path) or os.path.exists(self.numpy_model_path),
             'model_path': self.model_path,
-            'classes': list(self.label_encoder.classes_) if self.is_trained else ['BUY', 'SELL', 'HOLD'],
+            'classes': list(self.label_encoder.classes_) if self.is_trained and self.label_encoder is not None else ['BUY', 'SELL', 'HOLD'],
         }
-        if self.model and self.is_trained:
+        if self.is_trained and self.model is None and self._numpy_model_is_current():
+            try:
+                info.update(read_model_metadata(self.numpy_model_path))
+            except Exception as e:
+                self.logger.warning(f"Could not read NumPy model metadata: {str(e)}")
+        elif self.model and self.is_trained:
             try:
                 info.update({
                     'input_shape': self.model.input_shape,
@@ -122,9 +220,16 @@ class TradingNeuralNetwork:
     def train_model(self, data_fetcher, technical_analyzer, max_stocks: int = 15, epochs: int = 50) -> Dict[str, Any]:
         try:
             self.logger.info("Starting real neural network training...")
+            keras = _keras()
+            from sklearn.preprocessing import StandardScaler, LabelEncoder
+            from sklearn.model_selection import train_test_split
+            from sklearn.metrics import classification_report
             X, y = self.prepare_training_data(data_fetcher, technical_analyzer, max_stocks)
             if len(X) < 100:
                 raise ValueError(f"Insufficient training data: {len(X)} samples (need at least 100)")
+            self.scaler = StandardScaler()
+            self.label_encoder = LabelEncoder()
+            self.numpy_model = None
             y_encoded = self.label_encoder.fit_transform(y)
             y_categorical = keras.utils.to_categorical(y_encoded, num_classes=3)
             X_scaled = self.scaler.fit_transform(X)
@@ -179,52 +284,90 @@ class TradingNeuralNetwork:
         except Exception as e:
             self.logger.error(f"Error training model: {str(e)}")
             raise
+    def _fallback_prediction(self, error: str) -> Dict[str, Any]:
+        return {
+            'prediction': 'HOLD',
+            'confidence': 0.33,
+            'probabilities': {'BUY': 0.33, 'SELL': 0.33, 'HOLD': 0.34},
+            'error': error,
+            'timestamp': datetime.now().isoformat()
+        }
     def predict(self, features: List[float]) -> Dict[str, Any]:
+        return self.predict_batch([features])[0]
+    def predict_batch(self, feature_matrix) -> List[Dict[str, Any]]:
+        rows = len(feature_matrix)
+        if rows == 0:
+            return []
         try:
-            if not self.is_trained or self.model is None:
-                return {
-                    'prediction': 'HOLD',
-                    'confidence': 0.33,
-                    'probabilities': {'BUY': 0.33, 'SELL': 0.33, 'HOLD': 0.34},
-                    'error': 'Model is not trained',
-                    'timestamp': datetime.now().isoformat()
-                }
-            features_array = np.array([features])
+            engine = self._inference_engine() if self.is_trained else None
+            if engine is None:
+                return [self._fallback_prediction('Model is not trained') for _ in range(rows)]
+            if engine is not self:
+                return engine.predict_batch(feature_matrix)
+            features_array = np.asarray(feature_matrix, dtype=float).reshape(rows, -1)
             features_scaled = self.scaler.transform(features_array)
-            prediction_probs = self.model.predict(features_scaled, verbose=0)[0]
-            predicted_class_idx = np.argmax(prediction_probs)
-            predicted_class = self.label_encoder.classes_[predicted_class_idx]
-            confidence = float(prediction_probs[predicted_class_idx])
-            return {
-                'prediction': predicted_class,
-                'confidence': confidence,
-                'probabilities': {
-                    class_name: float(prob) 
-                    for class_name, prob in zip(self.label_encoder.classes_, prediction_probs)
-                },
-                'timestamp': datetime.now().isoformat()
-            }
+            prediction_probs = self.model.predict(features_scaled, batch_size=max(32, rows), verbose=0)
+            predicted_class_idx = np.argmax(prediction_probs, axis=1)
+            class_names = list(self.label_encoder.classes_)
+            timestamp = datetime.now().isoformat()
+            results = []
+            for probs, class_idx in zip(prediction_probs.tolist(), predicted_class_idx.tolist()):
+                results.append({
+                    'prediction': class_names[class_idx],
+                    'confidence': probs[class_idx],
+                    'probabilities': dict(zip(class_names, probs)),
+                    'timestamp': timestamp
+                })
+            return results
         except Exception as e:
             self.logger.error(f"Error making prediction: {str(e)}")
-            return {
-                'prediction': 'HOLD',
-                'confidence': 0.33,
-                'probabilities': {'BUY': 0.33, 'SELL': 0.33, 'HOLD': 0.34},
-                'error': str(e),
-                'timestamp': datetime.now().isoformat()
-            }
+            return [self._fallback_prediction(str(e)) for _ in range(rows)]
+    def _cached_feature_vector(self, symbol: str, exchange: str, data, technical_analyzer) -> List[float]:
+        key = (symbol, exchange, len(data), data.index[-1], float(data['Close'].iloc[-1]))
+        features = self._feature_cache.get(key)
+        if features is None:
+            features = technical_analyzer.get_feature_vector(data)
+            self._feature_cache[key] = features
+            while len(self._feature_cache) > self.feature_cache_size:
+                self._feature_cache.popitem(last=False)
+        else:
+            self._feature_cache.move_to_end(key)
+        return features
     def predict_portfolio_positions(self, positions_data: List[Dict], 
                                   technical_analyzer, data_fetcher) -> List[Dict]:
-        predictions = []
-        for position in positions_data:
+        if not self.is_trained:
+            return [
+                dict(self._fallback_prediction('Model is not trained'),
+                     symbol=position.get('symbol', ''),
+                     exchange=position.get('exchange', ''),
+                     current_price=position.get('current_price', 0),
+                     unrealized_pnl_percent=position.get('unrealized_pnl_percent', 0))
+                for position in positions_data
+                if position.get('symbol') and position.get('exchange')
+            ]
+        predictions = [None] * len(positions_data)
+        pending_indices = []
+        pending_features = []
+        by_exchange = {}
+        for index, position in enumerate(positions_data):
+            symbol = position.get('symbol', '')
+            exchange = position.get('exchange', '')
+            if symbol and exchange:
+                by_exchange.setdefault(exchange, []).append(symbol)
+        market_data = {}
+        for exchange, symbols in by_exchange.items():
+            batch = data_fetcher.get_stock_data_many(list(dict.fromkeys(symbols)), exchange, period='3mo', interval='1d')
+            for symbol, result in batch.items():
+                market_data[(symbol, exchange)] = result['data']
+        for index, position in enumerate(positions_data):
             try:
                 symbol = position.get('symbol', '')
                 exchange = position.get('exchange', '')
                 if not symbol or not exchange:
                     continue
-                data = data_fetcher.get_stock_data(symbol, exchange, period='3mo', interval='1d')
+                data = market_data.get((symbol, exchange))
                 if data is None or len(data) < 50:
-                    predictions.append({
+                    predictions[index] = {
                         'symbol': symbol,
                         'exchange': exchange,
                         'prediction': 'HOLD',
@@ -232,11 +375,11 @@ class TradingNeuralNetwork:
                         'error': 'Insufficient data',
                         'current_price': position.get('current_price', 0),
                         'unrealized_pnl_percent': position.get('unrealized_pnl_percent', 0)
-                    })
+                    }
                     continue
-                features = technical_analyzer.get_feature_vector(data)
+                features = self._cached_feature_vector(symbol, exchange, data, technical_analyzer)
                 if len(features) != 12:
-                    predictions.append({
+                    predictions[index] = {
                         'symbol': symbol,
                         'exchange': exchange,
                         'prediction': 'HOLD',
@@ -244,19 +387,13 @@ class TradingNeuralNetwork:
                         'error': 'Feature calculation error',
                         'current_price': position.get('current_price', 0),
                         'unrealized_pnl_percent': position.get('unrealized_pnl_percent', 0)
-                    })
+                    }
                     continue
-                result = self.predict(features)
-                result.update({
-                    'symbol': symbol,
-                    'exchange': exchange,
-                    'current_price': position.get('current_price', 0),
-                    'unrealized_pnl_percent': position.get('unrealized_pnl_percent', 0)
-                })
-                predictions.append(result)
+                pending_indices.append(index)
+                pending_features.append(features)
             except Exception as e:
                 self.logger.error(f"Error predicting for {position.get('symbol', 'unknown')}: {str(e)}")
-                predictions.append({
+                predictions[index] = {
                     'symbol': position.get('symbol', ''),
                     'exchange': position.get('exchange', ''),
                     'prediction': 'HOLD',
@@ -264,26 +401,46 @@ class TradingNeuralNetwork:
                     'error': str(e),
                     'current_price': position.get('current_price', 0),
                     'unrealized_pnl_percent': position.get('unrealized_pnl_percent', 0)
-                })
-        return predictions
+                }
+        for index, result in zip(pending_indices, self.predict_batch(pending_features)):
+            position = positions_data[index]
+            result.update({
+                'symbol': position.get('symbol', ''),
+                'exchange': position.get('exchange', ''),
+                'current_price': position.get('current_price', 0),
+                'unrealized_pnl_percent': position.get('unrealized_pnl_percent', 0)
+            })
+            predictions[index] = result
+        return [prediction for prediction in predictions if prediction is not None]
     def save_model(self):
         try:
+            import joblib
             if self.model:
                 self.model.save(self.model_path)
                 self.logger.info(f"Model saved to {self.model_path}")
             joblib.dump(self.scaler, self.scaler_path)
             joblib.dump(self.label_encoder, self.encoder_path)
+            if self.model:
+                self.export_numpy_model()
             self.logger.info("Model components saved successfully")
             return True
         except Exception as e:
             self.logger.error(f"Error saving model: {str(e)}")
             return False
+    def export_numpy_model(self, path: str = None) -> bool:
+        try:
+            path = path or self.numpy_model_path
+            export_numpy_model(self.model, self.scaler, self.label_encoder.classes_, path)
+            self.logger.info(f"NumPy inference weights exported to {path}")
+            return True
+        except Exception as e:
+            self.logger.error(f"Error exporting NumPy model: {str(e)}")
+            return False
     def load_model(self) -> bool:
         try:
-            if (os.path.exists(self.model_path) and 
-                os.path.exists(self.scaler_path) and 
-                os.path.exists(self.encoder_path)):
-                self.model = keras.models.load_model(self.model_path)
+            if self._saved_model_exists():
+                import joblib
+                self.model = _keras().models.load_model(self.model_path)
                 self.scaler = joblib.load(self.scaler_path)
                 self.label_encoder = joblib.load(self.encoder_path)
                 self.is_trained = True
@@ -291,6 +448,7 @@ class TradingNeuralNetwork:
                 return True
         except Exception as e:
             self.logger.warning(f"Could not load existing model: {str(e)}")
+        self.is_trained = False
         return False
     def retrain_with_new_data(self, data_fetcher, technical_analyzer, max_stocks: int = 15):
         try:
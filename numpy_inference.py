@@ -0,0 +1,152 @@
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+import numpy as np
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0.0),
+    'sigmoid': lambda x: 1.0 / (1.0 + np.exp(-x)),
+    'tanh': np.tanh
+}
+def _softmax(x: np.ndarray) -> np.ndarray:
+    shifted = np.exp(x - x.max(axis=1, keepdims=True))
+    return shifted / shifted.sum(axis=1, keepdims=True)
+ACTIVATIONS['softmax'] = _softmax
+def fold_keras_layers(model) -> List[Tuple[np.ndarray, np.ndarray, str]]:
+    folded = []
+    pending_scale = None
+    pending_shift = None
+    for layer in model.layers:
+        layer_type = type(layer).__name__
+        config = layer.get_config()
+        if layer_type == 'Dense':
+            weights = layer.get_weights()
+            kernel = weights[0].astype(np.float64)
+            bias = weights[1].astype(np.float64) if len(weights) > 1 else np.zeros(kernel.shape[1])
+            if pending_scale is not None:
+                bias = pending_shift @ kernel + bias
+                kernel = pending_scale[:, None] * kernel
+                pending_scale = pending_shift = None
+            activation = config.get('activation', 'linear')
+            if activation not in ACTIVATIONS:
+                raise ValueError(f"Unsupported activation for export: {activation}")
+            folded.append((kernel, bias, activation))
+        elif layer_type == 'BatchNormalization':
+            weights = list(layer.get_weights())
+            gamma = weights.pop(0).astype(np.float64) if config.get('scale', True) else None
+            beta = weights.pop(0).astype(np.float64) if config.get('center', True) else None
+            moving_mean, moving_variance = (w.astype(np.float64) for w in weights)
+            scale = 1.0 / np.sqrt(moving_variance + config.get('epsilon', 1e-3))
+            if gamma is not None:
+                scale = scale * gamma
+            shift = -moving_mean * scale
+            if beta is not None:
+                shift = shift + beta
+            if pending_scale is not None:
+                shift = pending_shift * scale + shift
+                scale = pending_scale * scale
+            pending_scale, pending_shift = scale, shift
+        elif layer_type in ('Dropout', 'InputLayer', 'Flatten'):
+            continue
+        else:
+            raise ValueError(f"Unsupported layer for export: {layer_type}")
+    if pending_scale is not None:
+        folded.append((np.diag(pending_scale), pending_shift, 'linear'))
+    return folded
+def export_numpy_model(model, scaler, classes, path: str) -> str:
+    layers = fold_keras_layers(model)
+    arrays = {
+        'n_layers': np.array(len(layers)),
+        'scaler_mean': np.asarray(scaler.mean_, dtype=np.float64),
+        'scaler_scale': np.asarray(scaler.scale_, dtype=np.float64),
+        'classes': np.asarray([str(c) for c in classes]),
+        'total_params': np.array(model.count_params()),
+        'model_layers': np.array(len(model.layers))
+    }
+    for i, (kernel, bias, activation) in enumerate(layers):
+        arrays[f'kernel_{i}'] = kernel
+        arrays[f'bias_{i}'] = bias
+        arrays[f'activation_{i}'] = np.array(activation)
+    tmp_path = path + '.tmp.npz'
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+    return path
+def read_model_metadata(path: str) -> Dict[str, Any]:
+    with np.load(path) as archive:
+        metadata = {
+            'classes': [str(c) for c in archive['classes']],
+            'input_shape': (None, int(archive['kernel_0'].shape[0]))
+        }
+        if 'total_params' in archive.files:
+            metadata['total_params'] = int(archive['total_params'])
+            metadata['layers'] = int(archive['model_layers'])
+    return metadata
+class NumpyTradingModel:
+    def __init__(self, model_path: str = os.path.join('models', 'trading_model.npz')):
+        self.logger = logging.getLogger(__name__)
+        self.model_path = model_path
+        self.layers = []
+        self.scaler_mean = None
+        self.scaler_scale = None
+        self.classes = ['BUY', 'HOLD', 'SELL']
+        self.is_trained = False
+        if os.path.exists(self.model_path):
+            self.load_model()
+    def load_model(self) -> bool:
+        try:
+            with np.load(self.model_path) as archive:
+                self.layers = [
+                    (archive[f'kernel_{i}'], archive[f'bias_{i}'], str(archive[f'activation_{i}']))
+                    for i in range(int(archive['n_layers']))
+                ]
+                self.scaler_mean = archive['scaler_mean']
+                self.scaler_scale = archive['scaler_scale']
+                self.classes = [str(c) for c in archive['classes']]
+            self.is_trained = True
+            self.logger.info(f"NumPy model loaded from {self.model_path}")
+            return True
+        except Exception as e:
+            self.logger.warning(f"Could not load NumPy model: {str(e)}")
+            self.is_trained = False
+            return False
+    def predict_proba(self, feature_matrix) -> np.ndarray:
+        x = np.asarray(feature_matrix, dtype=np.float64)
+        if x.ndim == 1:
+            x = x.reshape(1, -1)
+        x = (x - self.scaler_mean) / self.scaler_scale
+        for kernel, bias, activation in self.layers:
+            x = ACTIVATIONS[activation](x @ kernel + bias)
+        return x
+    def _fallback_prediction(self, error: str) -> Dict[str, Any]:
+        return {
+            'prediction': 'HOLD',
+            'confidence': 0.33,
+            'probabilities': {'BUY': 0.33, 'SELL': 0.33, 'HOLD': 0.34},
+            'error': error,
+            'timestamp': datetime.now().isoformat()
+        }
+    def predict(self, features: List[float]) -> Dict[str, Any]:
+        return self.predict_batch([features])[0]
+    def predict_batch(self, feature_matrix) -> List[Dict[str, Any]]:
+        rows = len(feature_matrix)
+        if rows == 0:
+            return []
+        try:
+            if not self.is_trained:
+                return [self._fallback_prediction('Model is not trained') for _ in range(rows)]
+            prediction_probs = self.predict_proba(feature_matrix)
+            predicted_class_idx = np.argmax(prediction_probs, axis=1)
+            timestamp = datetime.now().isoformat()
+            return [
+                {
+                    'prediction': self.classes[class_idx],
+                    'confidence': probs[class_idx],
+                    'probabilities': dict(zip(self.classes, probs)),
+                    'timestamp': timestamp
+                }
+                for probs, class_idx in zip(prediction_probs.tolist(), predicted_class_idx.tolist())
+            ]
+        except Exception as e:
+            self.logger.error(f"Error making prediction: {str(e)}")
+            return [self._fallback_prediction(str(e)) for _ in range(rows)]
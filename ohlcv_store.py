@@ -0,0 +1,168 @@
+import json
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+class OHLCVStore:
+    MAX_HOLIDAY_WEEKDAYS = 3
+    PERIOD_OFFSETS = {
+        '1wk': pd.DateOffset(weeks=1),
+        '1mo': pd.DateOffset(months=1),
+        '3mo': pd.DateOffset(months=3),
+        '6mo': pd.DateOffset(months=6),
+        '1y': pd.DateOffset(years=1),
+        '2y': pd.DateOffset(years=2),
+        '5y': pd.DateOffset(years=5),
+        '10y': pd.DateOffset(years=10)
+    }
+    def __init__(self, root_dir: str = 'data/ohlcv'):
+        self.logger = logging.getLogger(__name__)
+        self.root_dir = root_dir
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        os.makedirs(self.root_dir, exist_ok=True)
+    def _lock_for(self, ticker_symbol: str, interval: str) -> threading.Lock:
+        key = (ticker_symbol, interval)
+        with self._locks_lock:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+    def _paths(self, ticker_symbol: str, interval: str) -> Tuple[str, str, str]:
+        key_dir = os.path.join(self.root_dir, interval, ticker_symbol.replace(os.sep, '_'))
+        return (os.path.join(key_dir, 'index.bin'),
+                os.path.join(key_dir, 'values.bin'),
+                os.path.join(key_dir, 'meta.json'))
+    def _read_meta(self, meta_path: str) -> Optional[Dict]:
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, 'r') as f:
+            return json.load(f)
+    def _row_count(self, index_path: str, values_path: str, n_columns: int) -> int:
+        if not os.path.exists(index_path) or not os.path.exists(values_path):
+            return 0
+        index_rows = os.path.getsize(index_path) // 8
+        value_rows = os.path.getsize(values_path) // (8 * n_columns) if n_columns else 0
+        return min(index_rows, value_rows)
+    def read(self, ticker_symbol: str, interval: str) -> Optional[pd.DataFrame]:
+        index_path, values_path, meta_path = self._paths(ticker_symbol, interval)
+        with self._lock_for(ticker_symbol, interval):
+            meta = self._read_meta(meta_path)
+            if meta is None:
+                return None
+            columns = meta['columns']
+            rows = self._row_count(index_path, values_path, len(columns))
+            if rows == 0:
+                return None
+            timestamps = np.array(np.memmap(index_path, dtype=np.int64, mode='r', shape=(rows,)))
+            values = np.array(np.memmap(values_path, dtype=np.float64, mode='r', shape=(rows, len(columns))))
+        if meta.get('tz'):
+            index = pd.to_datetime(timestamps, utc=True).tz_convert(meta['tz'])
+        else:
+            index = pd.to_datetime(timestamps)
+        return pd.DataFrame(values, index=index, columns=columns)
+    def last_timestamp(self, ticker_symbol: str, interval: str) -> Optional[pd.Timestamp]:
+        data = self.read(ticker_symbol, interval)
+        if data is None or data.empty:
+            return None
+        return data.index[-1]
+    def _write_meta(self, meta_path: str, meta: Dict):
+        tmp_path = meta_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+    def append(self, ticker_symbol: str, interval: str, data: pd.DataFrame, symbol: Optional[str] = None,
+               exchange: Optional[str] = None) -> int:
+        if data is None or data.empty:
+            return 0
+        data = data.sort_index()
+        data = data[~data.index.duplicated(keep='last')]
+        index_path, values_path, meta_path = self._paths(ticker_symbol, interval)
+        with self._lock_for(ticker_symbol, interval):
+            os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+            meta = self._read_meta(meta_path)
+            if meta is None:
+                numeric = data.select_dtypes(include='number')
+                meta = {
+                    'columns': list(numeric.columns),
+                    'tz': str(data.index.tz) if data.index.tz is not None else ''
+                }
+                if exchange is not None:
+                    meta.update({'symbol': symbol or ticker_symbol, 'exchange': exchange})
+                self._write_meta(meta_path, meta)
+                for path in (index_path, values_path):
+                    open(path, 'wb').close()
+            elif exchange is not None and meta.get('exchange') != exchange:
+                meta.update({'symbol': symbol or ticker_symbol, 'exchange': exchange})
+                self._write_meta(meta_path, meta)
+            columns = meta['columns']
+            new_index = pd.DatetimeIndex(data.index)
+            if meta['tz'] and new_index.tz is None:
+                new_index = new_index.tz_localize(meta['tz'])
+            elif not meta['tz'] and new_index.tz is not None:
+                new_index = new_index.tz_localize(None)
+            new_timestamps = new_index.as_unit('ns').asi8.astype(np.int64)
+            new_values = data.reindex(columns=columns).to_numpy(dtype=np.float64)
+            rows = self._row_count(index_path, values_path, len(columns))
+            keep_rows = 0
+            if rows:
+                stored = np.memmap(index_path, dtype=np.int64, mode='r', shape=(rows,))
+                keep_rows = int(np.searchsorted(stored, new_timestamps[0], side='left'))
+                del stored
+            with open(values_path, 'r+b') as f:
+                f.truncate(keep_rows * 8 * len(columns))
+                f.seek(0, os.SEEK_END)
+                f.write(np.ascontiguousarray(new_values).tobytes())
+            with open(index_path, 'r+b') as f:
+                f.truncate(keep_rows * 8)
+                f.seek(0, os.SEEK_END)
+                f.write(new_timestamps.tobytes())
+        self.logger.debug(f"Stored {len(new_timestamps)} bars for {ticker_symbol} ({interval}), {keep_rows + len(new_timestamps)} total")
+        return len(new_timestamps)
+    def window_start(self, data: pd.DataFrame, period: str) -> Optional[pd.Timestamp]:
+        if data is None or data.empty or period in ('max', None):
+            return None
+        if period.endswith('d') and period[:-1].isdigit():
+            sessions = data.index.normalize().unique()
+            days = int(period[:-1])
+            if len(sessions) < days:
+                return None
+            return sessions[-days]
+        now = pd.Timestamp.now(tz=data.index.tz)
+        if period == 'ytd':
+            return now.normalize().replace(month=1, day=1)
+        offset = self.PERIOD_OFFSETS.get(period)
+        if offset is None:
+            return None
+        return now - offset
+    def covers(self, data: pd.DataFrame, period: str) -> bool:
+        if data is None or data.empty:
+            return False
+        if period == 'max':
+            return False
+        start = self.window_start(data, period)
+        if start is None or start > data.index[-1]:
+            return False
+        first_session = data.index[0].normalize()
+        start_day = start.normalize()
+        if first_session <= start_day:
+            return True
+        return np.busday_count(start_day.date(), first_session.date()) <= self.MAX_HOLIDAY_WEEKDAYS
+    def slice_period(self, data: pd.DataFrame, period: str) -> pd.DataFrame:
+        start = self.window_start(data, period)
+        if start is None:
+            return data
+        return data[data.index >= start]
+    def symbols(self, interval: str) -> List[str]:
+        interval_dir = os.path.join(self.root_dir, interval)
+        if not os.path.isdir(interval_dir):
+            return []
+        return sorted(os.listdir(interval_dir))
+    def exchange_symbols(self, interval: str, exchange: str) -> List[str]:
+        symbols = []
+        for key in self.symbols(interval):
+            meta = self._read_meta(os.path.join(self.root_dir, interval, key, 'meta.json'))
+            if meta is not None and meta.get('exchange') == exchange:
+                symbols.append(meta['symbol'])
+        return symbols
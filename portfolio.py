@@ -1,91 +1,307 @@
+import heapq
 import json
 import os
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+import time
+from datetime import datetime
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
 import logging
-class FastPortfolioManager:
+import numpy as np
+@dataclass(slots=True)
+class Position:
+    symbol: str
+    exchange: str
+    quantity: int
+    avg_cost: float
+    added_at: str
+    updated_at: str
+    def to_dict(self) -> Dict:
+        return {
+            'symbol': self.symbol,
+            'exchange': self.exchange,
+            'quantity': self.quantity,
+            'avg_cost': self.avg_cost,
+            'added_at': self.added_at,
+            'updated_at': self.updated_at
+        }
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Position':
+        return cls(
+            symbol=data['symbol'],
+            exchange=data['exchange'],
+            quantity=data['quantity'],
+            avg_cost=data['avg_cost'],
+            added_at=data.get('added_at', ''),
+            updated_at=data.get('updated_at', '')
+        )
+class ExposureIndex:
     def __init__(self):
+        self._holdings = {}
+        self._totals = {}
+    def clear(self):
+        self._holdings.clear()
+        self._totals.clear()
+    def update(self, user_id: str, key: Tuple[str, str], position: Optional[Position]):
+        holders = self._holdings.get(key)
+        previous = holders.pop(user_id, None) if holders is not None else None
+        totals = self._totals.get(key)
+        if previous is not None:
+            totals[0] -= previous[0]
+            totals[1] -= previous[1]
+        if position is not None and position.quantity > 0:
+            if holders is None:
+                holders = self._holdings[key] = {}
+                totals = self._totals[key] = [0, 0.0]
+            holding = (position.quantity, position.quantity * position.avg_cost)
+            holders[user_id] = holding
+            totals[0] += holding[0]
+            totals[1] += holding[1]
+        elif holders is not None and not holders:
+            del self._holdings[key]
+            del self._totals[key]
+    def rebuild(self, portfolios: Dict):
+        self.clear()
+        for user_id, portfolio in portfolios.items():
+            for key, position in portfolio['positions'].items():
+                self.update(user_id, key, position)
+    def _entry(self, key: Tuple[str, str]) -> Dict:
+        quantity, cost_basis = self._totals[key]
+        return {
+            'symbol': key[0],
+            'exchange': key[1],
+            'quantity': quantity,
+            'cost_basis': cost_basis,
+            'holders': len(self._holdings[key])
+        }
+    def get(self, symbol: str, exchange: str) -> Optional[Dict]:
+        key = (symbol.upper(), exchange.upper())
+        return self._entry(key) if key in self._totals else None
+    def holders(self, symbol: str, exchange: str) -> Dict[str, int]:
+        holders = self._holdings.get((symbol.upper(), exchange.upper()), {})
+        return {user_id: holding[0] for user_id, holding in holders.items()}
+    def top(self, n: int = 10, by: str = 'cost_basis') -> List[Dict]:
+        column = 1 if by == 'cost_basis' else 0
+        keys = heapq.nlargest(n, self._totals, key=lambda key: self._totals[key][column])
+        return [self._entry(key) for key in keys]
+    def symbols(self) -> List[Tuple[str, str]]:
+        return list(self._totals)
+    def __len__(self) -> int:
+        return len(self._totals)
+class PortfolioTransaction:
+    def __init__(self, manager: 'FastPortfolioManager', user_id: str):
+        self.manager = manager
+        self.user_id = user_id
+        self.ops = []
+        self.committed = False
+    def add_position(self, symbol: str, exchange: str, quantity: int, avg_cost: float):
+        self.ops.append({'action': 'add', 'symbol': symbol, 'exchange': exchange,
+                         'quantity': quantity, 'avg_cost': avg_cost})
+    def remove_position(self, symbol: str, exchange: str, quantity: Optional[int] = None):
+        self.ops.append({'action': 'remove', 'symbol': symbol, 'exchange': exchange, 'quantity': quantity})
+    def __enter__(self) -> 'PortfolioTransaction':
+        return self
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        if exc_type is None:
+            self.manager._apply_positions(self.user_id, self.ops)
+            self.committed = True
+        return False
+class FastPortfolioManager:
+    def __init__(self, data_fetcher=None, neural_network=None, technical_analyzer=None):
         self.logger = logging.getLogger(__name__)
+        self.data_fetcher = data_fetcher
+        self.neural_network = neural_network
+        self.technical_analyzer = technical_analyzer
         self.data_file = 'data/fast_portfolios.json'
+        self.journal_file = 'data/fast_portfolios.journal'
         self.cache_file = 'data/portfolio_cache.json'
+        self.compact_every = 1000
+        self.journal_entries = 0
         self.portfolios = {}
+        self.exposure = ExposureIndex()
         self.cache = {}
-        self.cache_duration = 300
+        quote_cache = getattr(data_fetcher, 'quote_cache', None)
+        self.cache_duration = quote_cache.default_ttl if quote_cache is not None else 300
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_invalidations = 0
         os.makedirs('data', exist_ok=True)
         self.load_portfolios()
         self.load_cache()
     def load_portfolios(self):
         try:
+            self.portfolios = {}
             if os.path.exists(self.data_file):
                 with open(self.data_file, 'r') as f:
-                    self.portfolios = json.load(f)
-                self.logger.info(f"Loaded {len(self.portfolios)} portfolios")
-            else:
-                self.portfolios = {}
+                    snapshot = json.load(f)
+                for user_id, portfolio in snapshot.items():
+                    positions = {}
+                    for data in portfolio.get('positions', []):
+                        position = Position.from_dict(data)
+                        positions[(position.symbol, position.exchange)] = position
+                    self.portfolios[user_id] = {
+                        'positions': positions,
+                        'created_at': portfolio.get('created_at', ''),
+                        'updated_at': portfolio.get('updated_at', '')
+                    }
+            self.journal_entries = self._replay_journal()
+            self.exposure.rebuild(self.portfolios)
+            self.logger.info(f"Loaded {len(self.portfolios)} portfolios ({self.journal_entries} journal entries replayed)")
         except Exception as e:
             self.logger.error(f"Error loading portfolios: {e}")
             self.portfolios = {}
-    def save_portfolios(self):
+            self.exposure.clear()
+    def _replay_journal(self) -> int:
+        if not os.path.exists(self.journal_file):
+            return 0
+        replayed = 0
+        valid_bytes = 0
+        with open(self.journal_file, 'rb') as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    self.logger.warning("Skipping truncated journal entry")
+                    break
+                self._apply_event(event)
+                replayed += 1
+                valid_bytes += len(line)
+        if valid_bytes < os.path.getsize(self.journal_file):
+            with open(self.journal_file, 'r+b') as f:
+                f.truncate(valid_bytes)
+        return replayed
+    def _apply_event(self, event: Dict):
+        user_id = event['user_id']
+        if user_id not in self.portfolios:
+            self.portfolios[user_id] = {
+                'positions': {},
+                'created_at': event.get('created_at', event['updated_at']),
+                'updated_at': event['updated_at']
+            }
+        portfolio = self.portfolios[user_id]
+        positions = portfolio['positions']
+        if event['op'] == 'batch':
+            for child in event['events']:
+                self._apply_event(dict(child, user_id=user_id))
+        elif event['op'] == 'upsert':
+            position = Position.from_dict(event['position'])
+            positions[(position.symbol, position.exchange)] = position
+        elif event['op'] == 'delete':
+            positions.pop((event['symbol'], event['exchange']), None)
+        portfolio['updated_at'] = event['updated_at']
+    def _append_journal(self, event: Dict):
+        self._invalidate_summary(event['user_id'])
+        try:
+            with open(self.journal_file, 'a') as f:
+                f.write(json.dumps(event, default=str) + '\n')
+            self.journal_entries += 1
+            if self.journal_entries >= self.compact_every:
+                self.compact()
+        except Exception as e:
+            self.logger.error(f"Error writing portfolio journal: {e}")
+    def compact(self) -> bool:
+        if not self.save_portfolios():
+            return False
+        try:
+            with open(self.journal_file, 'w'):
+                pass
+            self.journal_entries = 0
+            return True
+        except Exception as e:
+            self.logger.error(f"Error truncating portfolio journal: {e}")
+            return False
+    def save_portfolios(self) -> bool:
         try:
-            with open(self.data_file, 'w') as f:
-                json.dump(self.portfolios, f, indent=2, default=str)
+            tmp_file = self.data_file + '.tmp'
+            snapshot = {
+                user_id: {
+                    'positions': [position.to_dict() for position in portfolio['positions'].values()],
+                    'created_at': portfolio['created_at'],
+                    'updated_at': portfolio['updated_at']
+                }
+                for user_id, portfolio in self.portfolios.items()
+            }
+            with open(tmp_file, 'w') as f:
+                json.dump(snapshot, f, indent=2, default=str)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.data_file)
+            return True
         except Exception as e:
             self.logger.error(f"Error saving portfolios: {e}")
+            return False
     def load_cache(self):
         try:
+            self.cache = {}
             if os.path.exists(self.cache_file):
                 with open(self.cache_file, 'r') as f:
                     cache_data = json.load(f)
-                    cache_time = datetime.fromisoformat(cache_data.get('timestamp', '2020-01-01'))
-                    if datetime.now() - cache_time < timedelta(seconds=self.cache_duration):
-                        self.cache = cache_data.get('data', {})
-                    else:
-                        self.cache = {}
+                now = time.time()
+                self.cache = {
+                    user_id: entry
+                    for user_id, entry in cache_data.get('entries', {}).items()
+                    if now - entry.get('cached_at', 0) < self.cache_duration
+                }
         except Exception as e:
             self.logger.error(f"Error loading cache: {e}")
             self.cache = {}
     def save_cache(self):
         try:
+            now = time.time()
             cache_data = {
                 'timestamp': datetime.now().isoformat(),
-                'data': self.cache
+                'entries': {
+                    user_id: entry for user_id, entry in self.cache.items()
+                    if now - entry['cached_at'] < self.cache_duration
+                }
             }
             with open(self.cache_file, 'w') as f:
                 json.dump(cache_data, f, indent=2, default=str)
         except Exception as e:
             self.logger.error(f"Error saving cache: {e}")
+    def _invalidate_summary(self, user_id: str):
+        if self.cache.pop(user_id, None) is not None:
+            self.cache_invalidations += 1
+    def get_cache_stats(self) -> Dict:
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            'entries': len(self.cache),
+            'ttl_seconds': self.cache_duration,
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+            'invalidations': self.cache_invalidations,
+            'hit_rate': self.cache_hits / lookups if lookups else 0.0
+        }
+    def _get_position(self, user_id: str, symbol: str, exchange: str) -> Optional[Position]:
+        portfolio = self.portfolios.get(user_id)
+        if portfolio is None:
+            return None
+        return portfolio['positions'].get((symbol.upper(), exchange.upper()))
     def add_position(self, user_id: str, symbol: str, exchange: str, 
                     quantity: int, avg_cost: float) -> bool:
         try:
+            updated_at = datetime.now().isoformat()
             if user_id not in self.portfolios:
                 self.portfolios[user_id] = {
-                    'positions': [],
-                    'created_at': datetime.now().isoformat(),
-                    'updated_at': datetime.now().isoformat()
+                    'positions': {},
+                    'created_at': updated_at,
+                    'updated_at': updated_at
                 }
-            for position in self.portfolios[user_id]['positions']:
-                if position['symbol'] == symbol.upper() and position['exchange'] == exchange.upper():
-                    old_quantity = position['quantity']
-                    old_cost = position['avg_cost']
-                    total_cost = (old_quantity * old_cost) + (quantity * avg_cost)
-                    new_quantity = old_quantity + quantity
-                    position['avg_cost'] = total_cost / new_quantity
-                    position['quantity'] = new_quantity
-                    position['updated_at'] = datetime.now().isoformat()
-                    self.portfolios[user_id]['updated_at'] = datetime.now().isoformat()
-                    self.save_portfolios()
-                    return True
-            new_position = {
-                'symbol': symbol.upper(),
-                'exchange': exchange.upper(),
-                'quantity': quantity,
-                'avg_cost': avg_cost,
-                'added_at': datetime.now().isoformat(),
-                'updated_at': datetime.now().isoformat()
-            }
-            self.portfolios[user_id]['positions'].append(new_position)
-            self.portfolios[user_id]['updated_at'] = datetime.now().isoformat()
-            self.save_portfolios()
+            portfolio = self.portfolios[user_id]
+            key = (symbol.upper(), exchange.upper())
+            position = portfolio['positions'].get(key)
+            if position is not None:
+                total_cost = (position.quantity * position.avg_cost) + (quantity * avg_cost)
+                new_quantity = position.quantity + quantity
+                position.avg_cost = total_cost / new_quantity
+                position.quantity = new_quantity
+                position.updated_at = updated_at
+            else:
+                position = Position(key[0], key[1], quantity, avg_cost, updated_at, updated_at)
+                portfolio['positions'][key] = position
+            portfolio['updated_at'] = updated_at
+            self.exposure.update(user_id, key, position)
+            self._append_journal({'op': 'upsert', 'user_id': user_id, 'position': position.to_dict(),
+                                  'created_at': portfolio['created_at'], 'updated_at': updated_at})
             return True
         except Exception as e:
             self.logger.error(f"Error adding position: {e}")
@@ -93,30 +309,166 @@ class FastPortfolioManager:
     def remove_position(self, user_id: str, symbol: str, exchange: str, 
                        quantity: Optional[int] = None) -> bool:
         try:
-            if user_id not in self.portfolios:
+            position = self._get_position(user_id, symbol, exchange)
+            if position is None:
                 return False
-            positions = self.portfolios[user_id]['positions']
-            for i, position in enumerate(positions):
-                if position['symbol'] == symbol.upper() and position['exchange'] == exchange.upper():
-                    if quantity is None:
-                        positions.pop(i)
-                    else:
-                        if quantity >= position['quantity']:
-                            positions.pop(i)
-                        else:
-                            position['quantity'] -= quantity
-                            position['updated_at'] = datetime.now().isoformat()
-                    self.portfolios[user_id]['updated_at'] = datetime.now().isoformat()
-                    self.save_portfolios()
-                    return True
-            return False
+            portfolio = self.portfolios[user_id]
+            updated_at = datetime.now().isoformat()
+            key = (position.symbol, position.exchange)
+            if quantity is None or quantity >= position.quantity:
+                del portfolio['positions'][key]
+                self.exposure.update(user_id, key, None)
+                event = {'op': 'delete', 'user_id': user_id, 'symbol': position.symbol,
+                         'exchange': position.exchange, 'updated_at': updated_at}
+            else:
+                position.quantity -= quantity
+                position.updated_at = updated_at
+                self.exposure.update(user_id, key, position)
+                event = {'op': 'upsert', 'user_id': user_id, 'position': position.to_dict(), 'updated_at': updated_at}
+            portfolio['updated_at'] = updated_at
+            self._append_journal(event)
+            return True
         except Exception as e:
             self.logger.error(f"Error removing position: {e}")
             return False
+    def _plan_positions(self, user_id: str, ops: List[Dict]) -> Dict[Tuple[str, str], List[float]]:
+        portfolio = self.portfolios.get(user_id)
+        existing = portfolio['positions'] if portfolio else {}
+        working = {}
+        for op in ops:
+            action = op.get('action', 'add')
+            symbol = str(op.get('symbol', '')).upper()
+            exchange = str(op.get('exchange', '')).upper()
+            quantity = op.get('quantity')
+            if not symbol or not exchange:
+                raise ValueError(f"Position operation is missing symbol or exchange: {op}")
+            key = (symbol, exchange)
+            if key not in working:
+                position = existing.get(key)
+                working[key] = [position.quantity, position.quantity * position.avg_cost] if position else [0, 0.0]
+            state = working[key]
+            if action == 'add':
+                if quantity is None or quantity <= 0:
+                    raise ValueError(f"Invalid quantity for {symbol} ({exchange}): {quantity}")
+                avg_cost = op.get('avg_cost')
+                if avg_cost is None or avg_cost < 0:
+                    raise ValueError(f"Invalid average cost for {symbol} ({exchange}): {avg_cost}")
+                state[0] += quantity
+                state[1] += quantity * avg_cost
+            elif action == 'remove':
+                if state[0] <= 0:
+                    raise ValueError(f"No position in {symbol} ({exchange}) to remove")
+                if quantity is not None and quantity <= 0:
+                    raise ValueError(f"Invalid quantity for {symbol} ({exchange}): {quantity}")
+                if quantity is None or quantity >= state[0]:
+                    state[0] = 0
+                    state[1] = 0.0
+                else:
+                    state[1] -= state[1] * quantity / state[0]
+                    state[0] -= quantity
+            else:
+                raise ValueError(f"Unknown position action: {action}")
+        return working
+    def _apply_positions(self, user_id: str, ops: List[Dict]) -> int:
+        working = self._plan_positions(user_id, ops)
+        if not working:
+            return 0
+        updated_at = datetime.now().isoformat()
+        if user_id not in self.portfolios:
+            self.portfolios[user_id] = {
+                'positions': {},
+                'created_at': updated_at,
+                'updated_at': updated_at
+            }
+        portfolio = self.portfolios[user_id]
+        positions = portfolio['positions']
+        events = []
+        for key, (quantity, total_cost) in working.items():
+            position = positions.get(key)
+            if quantity <= 0:
+                if position is not None:
+                    del positions[key]
+                    self.exposure.update(user_id, key, None)
+                    events.append({'op': 'delete', 'symbol': key[0], 'exchange': key[1], 'updated_at': updated_at})
+                continue
+            if position is None:
+                position = Position(key[0], key[1], quantity, total_cost / quantity, updated_at, updated_at)
+                positions[key] = position
+            else:
+                position.quantity = quantity
+                position.avg_cost = total_cost / quantity
+                position.updated_at = updated_at
+            self.exposure.update(user_id, key, position)
+            events.append({'op': 'upsert', 'position': position.to_dict(), 'updated_at': updated_at})
+        portfolio['updated_at'] = updated_at
+        self._append_journal({'op': 'batch', 'user_id': user_id, 'events': events,
+                              'created_at': portfolio['created_at'], 'updated_at': updated_at})
+        return len(events)
+    def apply_positions(self, user_id: str, ops: List[Dict]) -> bool:
+        try:
+            changed = self._apply_positions(user_id, ops)
+            self.logger.info(f"Applied {len(ops)} position operations to {changed} positions for {user_id}")
+            return True
+        except Exception as e:
+            self.logger.error(f"Error applying positions for {user_id}: {e}")
+            return False
+    def transaction(self, user_id: str) -> 'PortfolioTransaction':
+        return PortfolioTransaction(self, user_id)
+    def get_user_positions(self, user_id: str) -> List[Dict]:
+        portfolio = self.portfolios.get(user_id)
+        if portfolio is None:
+            return []
+        return [position.to_dict() for position in portfolio['positions'].values()]
+    def _get_market_prices(self, keys: List[Tuple[str, str]]) -> Tuple[np.ndarray, np.ndarray]:
+        if self.data_fetcher is None:
+            return np.zeros(len(keys)), np.zeros(len(keys))
+        try:
+            current = self.data_fetcher.get_current_prices(keys)
+            previous = self.data_fetcher.get_previous_closes(keys)
+            return (np.array([current.get(key, 0.0) for key in keys], dtype=float),
+                    np.array([previous.get(key, 0.0) for key in keys], dtype=float))
+        except Exception as e:
+            self.logger.error(f"Error getting market prices: {e}")
+            return np.zeros(len(keys)), np.zeros(len(keys))
+    def _get_predictions(self, keys: List[Tuple[str, str]], current_prices: np.ndarray,
+                         unrealized_pnl_percent: np.ndarray) -> List[Dict]:
+        fallback = {'prediction': 'HOLD', 'confidence': 0.33}
+        if self.neural_network is None or self.data_fetcher is None:
+            return [fallback] * len(keys)
+        try:
+            if self.technical_analyzer is None:
+                from analyser import TechnicalAnalyzer
+                self.technical_analyzer = TechnicalAnalyzer()
+            positions_data = [
+                {'symbol': symbol, 'exchange': exchange, 'current_price': price, 'unrealized_pnl_percent': pnl_percent}
+                for (symbol, exchange), price, pnl_percent in zip(keys, current_prices.tolist(), unrealized_pnl_percent.tolist())
+            ]
+            results = self.neural_network.predict_portfolio_positions(positions_data, self.technical_analyzer, self.data_fetcher)
+            by_key = {(result['symbol'], result['exchange']): result for result in results}
+            return [by_key.get(key, fallback) for key in keys]
+        except Exception as e:
+            self.logger.error(f"Error getting portfolio predictions: {e}")
+            return [fallback] * len(keys)
     def get_portfolio_summary(self, user_id: str) -> Optional[Dict]:
+        portfolio = self.portfolios.get(user_id)
+        if portfolio is None:
+            return None
+        entry = self.cache.get(user_id)
+        if (entry is not None and entry['updated_at'] == portfolio['updated_at']
+                and time.time() - entry['cached_at'] < self.cache_duration):
+            self.cache_hits += 1
+            return entry['summary']
+        self.cache_misses += 1
+        summary = self._build_portfolio_summary(user_id)
+        if summary is not None:
+            self.cache[user_id] = {
+                'cached_at': time.time(),
+                'updated_at': portfolio['updated_at'],
+                'summary': summary
+            }
+        return summary
+    def _build_portfolio_summary(self, user_id: str) -> Optional[Dict]:
         try:
-            if user_id not in self.portfolios:
-                return None
             portfolio = self.portfolios[user_id]
             positions = portfolio['positions']
             if not positions:
@@ -128,36 +480,58 @@ class FastPortfolioManager:
                     'total_pnl': 0,
                     'total_pnl_percent': 0,
                     'position_count': 0,
+                    'stale_position_count': 0,
                     'last_updated': portfolio.get('updated_at', ''),
                     'performance': 'No positions'
                 }
-            total_value = 0
-            total_cost = 0
-            processed_positions = []
-            for position in positions:
-                mock_current_price = position['avg_cost'] * (0.95 + (hash(position['symbol']) % 100) / 1000)
-                market_value = mock_current_price * position['quantity']
-                cost_basis = position['avg_cost'] * position['quantity']
-                unrealized_pnl = market_value - cost_basis
-                processed_position = {
-                    'symbol': position['symbol'],
-                    'exchange': position['exchange'],
-                    'quantity': position['quantity'],
-                    'avg_cost': position['avg_cost'],
-                    'current_price': mock_current_price,
-                    'market_value': market_value,
-                    'cost_basis': cost_basis,
-                    'unrealized_pnl': unrealized_pnl,
-                    'unrealized_pnl_percent': (unrealized_pnl / cost_basis) * 100 if cost_basis > 0 else 0,
-                    'day_change': mock_current_price * 0.02,
-                    'day_change_percent': 2.0,
-                    'prediction': 'HOLD',
-                    'confidence': 0.65,
-                    'last_updated': datetime.now().isoformat()
+            records = list(positions.values())
+            keys = [(position.symbol, position.exchange) for position in records]
+            quantities = np.array([position.quantity for position in records], dtype=float)
+            avg_costs = np.array([position.avg_cost for position in records], dtype=float)
+            current_prices, previous_closes = self._get_market_prices(keys)
+            price_stale = (current_prices <= 0) if self.data_fetcher is not None else np.zeros(len(keys), dtype=bool)
+            current_prices = np.where(current_prices > 0, current_prices, avg_costs)
+            previous_closes = np.where(previous_closes > 0, previous_closes, current_prices)
+            market_values = current_prices * quantities
+            cost_basis = avg_costs * quantities
+            unrealized_pnl = market_values - cost_basis
+            unrealized_pnl_percent = np.divide(unrealized_pnl * 100, cost_basis,
+                                               out=np.zeros_like(cost_basis), where=cost_basis > 0)
+            day_change = current_prices - previous_closes
+            day_change_percent = np.divide(day_change * 100, previous_closes,
+                                           out=np.zeros_like(previous_closes), where=previous_closes > 0)
+            predictions = self._get_predictions(keys, current_prices, unrealized_pnl_percent)
+            last_updated = datetime.now().isoformat()
+            processed_positions = [
+                {
+                    'symbol': symbol,
+                    'exchange': exchange,
+                    'quantity': quantity,
+                    'avg_cost': avg_cost,
+                    'current_price': price,
+                    'market_value': value,
+                    'cost_basis': cost,
+                    'unrealized_pnl': pnl,
+                    'unrealized_pnl_percent': pnl_percent,
+                    'day_change': change,
+                    'day_change_percent': change_percent,
+                    'prediction': prediction['prediction'],
+                    'confidence': prediction['confidence'],
+                    'price_stale': stale,
+                    'last_updated': last_updated
                 }
-                processed_positions.append(processed_position)
-                total_value += market_value
-                total_cost += cost_basis
+                for (symbol, exchange), quantity, avg_cost, price, value, cost, pnl, pnl_percent, change, change_percent, prediction, stale
+                in zip(keys, [position.quantity for position in records], avg_costs.tolist(), current_prices.tolist(),
+                       market_values.tolist(), cost_basis.tolist(), unrealized_pnl.tolist(),
+                       unrealized_pnl_percent.tolist(), day_change.tolist(), day_change_percent.tolist(), predictions,
+                       price_stale.tolist())
+            ]
+            if price_stale.any():
+                self.logger.warning(f"No current price for {int(price_stale.sum())} positions in {user_id}, "
+                                    f"excluding them from P&L totals")
+            priced = ~price_stale
+            total_value = float(market_values[priced].sum())
+            total_cost = float(cost_basis[priced].sum())
             total_pnl = total_value - total_cost
             total_pnl_percent = (total_pnl / total_cost) * 100 if total_cost > 0 else 0
             return {
@@ -168,7 +542,8 @@ class FastPortfolioManager:
                 'total_pnl': total_pnl,
                 'total_pnl_percent': total_pnl_percent,
                 'position_count': len(positions),
-                'last_updated': datetime.now().isoformat(),
+                'stale_position_count': int(price_stale.sum()),
+                'last_updated': last_updated,
                 'performance': 'Good' if total_pnl_percent > 0 else 'Poor' if total_pnl_percent < -5 else 'Neutral'
             }
         except Exception as e:
@@ -185,16 +560,20 @@ class FastPortfolioManager:
                 {"symbol": "TSLA", "exchange": "NASDAQ", "quantity": 30, "avg_cost": 200.00},
                 {"symbol": "RELIANCE", "exchange": "NSE", "quantity": 200, "avg_cost": 2400.00}
             ]
-            for pos in sample_positions:
-                self.add_position(user_id, pos["symbol"], pos["exchange"], 
-                                pos["quantity"], pos["avg_cost"])
-            return True
+            return self.apply_positions(user_id, sample_positions)
         except Exception as e:
             self.logger.error(f"Error creating sample portfolio: {e}")
             return False
+    def get_exposure(self, symbol: str, exchange: str) -> Optional[Dict]:
+        return self.exposure.get(symbol, exchange)
+    def get_holders(self, symbol: str, exchange: str) -> Dict[str, int]:
+        return self.exposure.holders(symbol, exchange)
+    def get_top_exposures(self, n: int = 10, by: str = 'cost_basis') -> List[Dict]:
+        return self.exposure.top(n, by)
     def get_portfolio_stats(self) -> Dict:
         return {
             'total_portfolios': len(self.portfolios),
             'total_positions': sum(len(p['positions']) for p in self.portfolios.values()),
+            'total_symbols': len(self.exposure),
             'last_updated': datetime.now().isoformat()
         }
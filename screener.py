@@ -0,0 +1,134 @@
+import logging
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+PRICE_METRICS = ['price', 'change', 'change_percent', 'period_change', 'period_change_percent']
+SCREEN_METRICS = ['price', 'change', 'change_percent', 'period_change', 'period_change_percent', 'volume',
+                  'volume_ratio', 'rsi', 'volatility', 'high_distance_percent']
+def build_panel(frames: Dict[str, pd.DataFrame], columns: List[str] = ('Close', 'Volume')) -> Dict:
+    frames = {symbol: data for symbol, data in frames.items() if data is not None and not data.empty}
+    if not frames:
+        return {'symbols': [], 'dates': pd.DatetimeIndex([]), **{column: np.empty((0, 0)) for column in columns}}
+    indexes = [pd.DatetimeIndex(data.index) for data in frames.values()]
+    timezone = indexes[0].tz
+    stamps = [(index.tz_convert(timezone) if timezone is not None else index).as_unit('ns').asi8 for index in indexes]
+    dates = np.unique(np.concatenate(stamps))
+    panel = {'symbols': list(frames)}
+    panel['dates'] = pd.to_datetime(dates, utc=True).tz_convert(timezone) if timezone is not None else pd.to_datetime(dates)
+    for column in columns:
+        panel[column] = np.full((len(frames), len(dates)), np.nan)
+    for row, (data, symbol_stamps) in enumerate(zip(frames.values(), stamps)):
+        positions = np.searchsorted(dates, symbol_stamps)
+        for column in columns:
+            panel[column][row, positions] = data[column].to_numpy(dtype=float)
+    return panel
+def _forward_fill(values: np.ndarray) -> np.ndarray:
+    valid = ~np.isnan(values)
+    last_valid = np.maximum.accumulate(np.where(valid, np.arange(values.shape[1]), -1), axis=1)
+    filled = np.take_along_axis(values, np.maximum(last_valid, 0), axis=1)
+    filled[last_valid < 0] = np.nan
+    return filled
+def _wilder_rsi(closes: np.ndarray, window: int = 14) -> np.ndarray:
+    previous = np.empty_like(closes)
+    previous[:, 0] = np.nan
+    previous[:, 1:] = closes[:, :-1]
+    deltas = np.where(np.isnan(previous) & ~np.isnan(closes), 0.0, closes - previous)
+    gains = pd.DataFrame(np.clip(deltas, 0, None).T)
+    losses = pd.DataFrame(np.clip(-deltas, 0, None).T)
+    average_gain = gains.ewm(alpha=1 / window, adjust=False, min_periods=window).mean().to_numpy()[-1]
+    average_loss = losses.ewm(alpha=1 / window, adjust=False, min_periods=window).mean().to_numpy()[-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - 100 / (1 + average_gain / average_loss)
+    return np.where(average_loss == 0, 100.0, rsi)
+def compute_screen_metrics(panel: Dict, lookback: int = 4, volume_window: int = 20) -> Dict[str, np.ndarray]:
+    symbols = panel['symbols']
+    if not symbols:
+        return {'symbols': np.array([], dtype=object), **{metric: np.empty(0) for metric in SCREEN_METRICS}}
+    closes = _forward_fill(panel['Close'])
+    volumes = panel['Volume']
+    bars = closes.shape[1]
+    price = closes[:, -1]
+    previous = closes[:, -2] if bars >= 2 else np.full(len(symbols), np.nan)
+    period_previous = closes[:, -lookback - 1] if bars > lookback else previous
+    period_previous = np.where(np.isnan(period_previous), previous, period_previous)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = price - previous
+        change_percent = np.where(previous > 0, change / previous * 100, 0.0)
+        period_change = price - period_previous
+        period_change_percent = np.where(period_previous > 0, period_change / period_previous * 100, 0.0)
+        last_volume = np.nan_to_num(volumes[:, -1])
+        average_volume = np.nanmean(volumes[:, -volume_window - 1:-1], axis=1) if bars > 1 else np.full(len(symbols), np.nan)
+        volume_ratio = np.where(average_volume > 0, last_volume / average_volume, 1.0)
+        returns = closes[:, 1:] / closes[:, :-1] - 1
+        volatility = np.nanstd(returns[:, -volume_window:], axis=1, ddof=1) * 100 if bars > 2 else np.zeros(len(symbols))
+        high = np.nanmax(closes[:, -volume_window:], axis=1)
+        high_distance_percent = (price / high - 1) * 100
+    rsi = _wilder_rsi(closes) if bars > 14 else np.full(len(symbols), np.nan)
+    return {
+        'symbols': np.array(symbols, dtype=object),
+        'price': price,
+        'change': change,
+        'change_percent': change_percent,
+        'period_change': period_change,
+        'period_change_percent': period_change_percent,
+        'volume': last_volume,
+        'volume_ratio': volume_ratio,
+        'rsi': rsi,
+        'volatility': volatility,
+        'high_distance_percent': high_distance_percent
+    }
+def top_n(values: np.ndarray, n: int, ascending: bool = False) -> np.ndarray:
+    keys = np.asarray(values, dtype=float)
+    keys = np.where(np.isnan(keys), np.inf, keys if ascending else -keys)
+    n = min(n, len(keys))
+    if n <= 0:
+        return np.empty(0, dtype=int)
+    candidates = np.argpartition(keys, n - 1)[:n] if n < len(keys) else np.arange(len(keys))
+    return candidates[np.argsort(keys[candidates], kind='stable')]
+class MarketScreener:
+    def __init__(self, data_fetcher, period: str = '3mo', interval: str = '1d', lookback: int = 4,
+                 volume_window: int = 20):
+        self.logger = logging.getLogger(__name__)
+        self.data_fetcher = data_fetcher
+        self.period = period
+        self.interval = interval
+        self.lookback = lookback
+        self.volume_window = volume_window
+    def load_panel(self, exchange: str, symbols: Optional[List[str]] = None, period: Optional[str] = None,
+                   fallback_periods: Optional[List[str]] = None, min_records: int = 2) -> Dict:
+        if symbols is None:
+            symbols = self.data_fetcher.get_exchange_symbols(exchange)
+        batch = self.data_fetcher.get_stock_data_many(symbols, exchange, period=period or self.period,
+                                                      interval=self.interval, fallback_periods=fallback_periods,
+                                                      min_records=min_records)
+        frames = {}
+        for symbol, result in batch.items():
+            if result['data'] is None or len(result['data']) < min_records:
+                self.logger.debug(f"Insufficient data for {symbol}, skipping: {result['error']}")
+                continue
+            frames[symbol] = result['data']
+        self.logger.info(f"Loaded screening panel for {len(frames)}/{len(symbols)} {exchange} symbols")
+        return build_panel(frames)
+    def screen(self, exchange: str, symbols: Optional[List[str]] = None, period: Optional[str] = None,
+               fallback_periods: Optional[List[str]] = None, min_records: int = 2) -> Dict[str, np.ndarray]:
+        panel = self.load_panel(exchange, symbols, period, fallback_periods, min_records)
+        return compute_screen_metrics(panel, self.lookback, self.volume_window)
+    def top(self, metrics: Dict[str, np.ndarray], by: str, n: int = 10, ascending: bool = False,
+            absolute: bool = False, fields: Optional[List[str]] = None) -> List[Dict]:
+        values = np.abs(metrics[by]) if absolute else metrics[by]
+        fields = fields or SCREEN_METRICS
+        priced = np.isfinite(np.asarray(values, dtype=float))
+        for field in PRICE_METRICS:
+            if field in fields:
+                priced &= np.isfinite(metrics[field])
+        candidates = np.flatnonzero(priced)
+        rows = []
+        for i in candidates[top_n(values[candidates], n, ascending)].tolist():
+            row = {'symbol': metrics['symbols'][i]}
+            for field in fields:
+                value = metrics[field][i]
+                row[field] = int(value) if field == 'volume' else (round(float(value), 2) if np.isfinite(value) else None)
+            rows.append(row)
+        return rows
+    def to_frame(self, metrics: Dict[str, np.ndarray]) -> pd.DataFrame:
+        return pd.DataFrame({metric: metrics[metric] for metric in SCREEN_METRICS}, index=metrics['symbols'])
@@ -0,0 +1,163 @@
+import itertools
+import logging
+import os
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from analyser import SIGNAL_CODES, SIGNAL_THRESHOLDS, TechnicalAnalyzer, score_trading_signal_arrays
+from backtester import signal_positions, simulate_positions
+from neuralnetwork import FEATURE_WARMUP, LABEL_HORIZON, LABEL_THRESHOLD
+SIGNAL_PARAMETERS = {name: value for name, value in SIGNAL_THRESHOLDS.items() if name != 'volume_low'}
+LABEL_PARAMETERS = {'label_horizon': LABEL_HORIZON, 'label_threshold': LABEL_THRESHOLD}
+PANEL_COLUMNS = ['close', 'rsi', 'macd', 'macd_signal', 'bb_position', 'volume_ratio']
+BACKTEST_METRICS = ['total_return', 'annualized_return', 'sharpe_ratio', 'max_drawdown', 'hit_rate', 'annual_turnover']
+_worker_panel = None
+_worker_shared_memory = None
+def _attach_panel(name: str, shape: Tuple[int, int]):
+    global _worker_panel, _worker_shared_memory
+    _worker_shared_memory = shared_memory.SharedMemory(name=name)
+    _worker_panel = np.ndarray(shape, dtype=np.float64, buffer=_worker_shared_memory.buf)
+def _label_precision(close_prices: np.ndarray, signals: np.ndarray, horizon: int, threshold: float) -> Dict[str, int]:
+    end = len(close_prices) - horizon
+    if end <= FEATURE_WARMUP:
+        return {'buy_signals': 0, 'buy_hits': 0, 'sell_signals': 0, 'sell_hits': 0, 'labels': 0,
+                'buy_labels': 0, 'sell_labels': 0}
+    current_prices = close_prices[FEATURE_WARMUP:end]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return_pct = (close_prices[FEATURE_WARMUP + horizon:] - current_prices) / current_prices * 100
+    valid = np.isfinite(return_pct)
+    buy_labels = valid & (return_pct > threshold)
+    sell_labels = valid & (return_pct < -threshold)
+    window_signals = signals[FEATURE_WARMUP:end]
+    buys = valid & (window_signals == SIGNAL_CODES['BUY'])
+    sells = valid & (window_signals == SIGNAL_CODES['SELL'])
+    return {
+        'buy_signals': int(buys.sum()),
+        'buy_hits': int((buys & buy_labels).sum()),
+        'sell_signals': int(sells.sum()),
+        'sell_hits': int((sells & sell_labels).sum()),
+        'labels': int(valid.sum()),
+        'buy_labels': int(buy_labels.sum()),
+        'sell_labels': int(sell_labels.sum())
+    }
+def evaluate_signal_parameters(task: Dict[str, Any], panel: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+    panel = _worker_panel if panel is None else panel
+    signal_params = task['signal_params']
+    metrics = {metric: [] for metric in BACKTEST_METRICS}
+    label_counts = [dict.fromkeys(('buy_signals', 'buy_hits', 'sell_signals', 'sell_hits', 'labels',
+                                   'buy_labels', 'sell_labels'), 0) for _ in task['label_params']]
+    for start, end in task['offsets']:
+        close_prices = panel[start:end, 0]
+        signals, _ = score_trading_signal_arrays(*panel[start:end, 1:].T, **signal_params)
+        signals[:FEATURE_WARMUP - 1] = SIGNAL_CODES['HOLD']
+        result = simulate_positions(close_prices, signal_positions(signals, task['allow_short']), task['fee_bps'],
+                                    task['slippage_bps'], task['periods_per_year'])
+        for metric in BACKTEST_METRICS:
+            metrics[metric].append(result[metric])
+        for counts, label_params in zip(label_counts, task['label_params']):
+            precision = _label_precision(close_prices, signals, label_params['label_horizon'],
+                                         label_params['label_threshold'])
+            for name, value in precision.items():
+                counts[name] += value
+    summary = dict(signal_params)
+    summary.update({f'mean_{metric}': float(np.mean(values)) for metric, values in metrics.items()})
+    summary['worst_drawdown'] = float(np.min(metrics['max_drawdown']))
+    rows = []
+    for counts, label_params in zip(label_counts, task['label_params']):
+        row = dict(summary)
+        row.update(label_params)
+        signals_total = counts['buy_signals'] + counts['sell_signals']
+        row['buy_precision'] = counts['buy_hits'] / counts['buy_signals'] if counts['buy_signals'] else 0.0
+        row['sell_precision'] = counts['sell_hits'] / counts['sell_signals'] if counts['sell_signals'] else 0.0
+        row['signal_precision'] = (counts['buy_hits'] + counts['sell_hits']) / signals_total if signals_total else 0.0
+        row['label_buy_share'] = counts['buy_labels'] / counts['labels'] if counts['labels'] else 0.0
+        row['label_sell_share'] = counts['sell_labels'] / counts['labels'] if counts['labels'] else 0.0
+        row['signals'] = signals_total
+        rows.append(row)
+    return rows
+class ParameterSweep:
+    def __init__(self, data_fetcher=None, technical_analyzer: Optional[TechnicalAnalyzer] = None,
+                 fee_bps: float = 10.0, slippage_bps: float = 5.0, allow_short: bool = False,
+                 periods_per_year: int = 252, max_workers: Optional[int] = None):
+        self.logger = logging.getLogger(__name__)
+        self.data_fetcher = data_fetcher
+        self.technical_analyzer = technical_analyzer or TechnicalAnalyzer()
+        self.fee_bps = fee_bps
+        self.slippage_bps = slippage_bps
+        self.allow_short = allow_short
+        self.periods_per_year = periods_per_year
+        self.max_workers = max_workers
+        self.symbols = []
+        self._blocks = []
+    def add_data(self, symbol: str, exchange: str, data: pd.DataFrame) -> bool:
+        if data is None or len(data) < FEATURE_WARMUP:
+            self.logger.warning(f"Insufficient data for {symbol} ({exchange}), skipping")
+            return False
+        indicators = self.technical_analyzer.get_signal_indicators(data)
+        self._blocks.append(np.column_stack([data['Close'].to_numpy(dtype=float), indicators]))
+        self.symbols.append((symbol, exchange))
+        return True
+    def load_universe(self, symbols: List[str], exchange: str, period: str = '5y', interval: str = '1d') -> int:
+        if self.data_fetcher is None:
+            raise ValueError("A data fetcher is required to load symbols")
+        batch = self.data_fetcher.get_stock_data_many(symbols, exchange, period=period, interval=interval)
+        return sum(self.add_data(symbol, exchange, result['data']) for symbol, result in batch.items())
+    def expand_grid(self, grid: Dict[str, List]) -> Tuple[List[Dict], List[Dict]]:
+        unknown = set(grid) - set(SIGNAL_PARAMETERS) - set(LABEL_PARAMETERS)
+        if unknown:
+            raise ValueError(f"Unknown sweep parameters: {', '.join(sorted(unknown))}")
+        def combinations(defaults: Dict) -> List[Dict]:
+            names = list(defaults)
+            values = [list(grid.get(name, [defaults[name]])) for name in names]
+            return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+        return combinations(SIGNAL_PARAMETERS), combinations(LABEL_PARAMETERS)
+    def run(self, grid: Dict[str, List], rank_by: str = 'mean_sharpe_ratio', ascending: bool = False) -> pd.DataFrame:
+        if not self._blocks:
+            raise ValueError("No symbol data loaded for the sweep")
+        signal_grid, label_grid = self.expand_grid(grid)
+        lengths = np.array([len(block) for block in self._blocks])
+        ends = np.cumsum(lengths)
+        offsets = list(zip((ends - lengths).tolist(), ends.tolist()))
+        tasks = [{
+            'signal_params': signal_params,
+            'label_params': label_grid,
+            'offsets': offsets,
+            'fee_bps': self.fee_bps,
+            'slippage_bps': self.slippage_bps,
+            'allow_short': self.allow_short,
+            'periods_per_year': self.periods_per_year
+        } for signal_params in signal_grid]
+        self.logger.info(f"Sweeping {len(signal_grid) * len(label_grid)} parameter sets over {len(self.symbols)} symbols")
+        panel_shape = (int(ends[-1]), len(PANEL_COLUMNS))
+        shm = shared_memory.SharedMemory(create=True, size=panel_shape[0] * panel_shape[1] * 8)
+        panel = None
+        try:
+            panel = np.ndarray(panel_shape, dtype=np.float64, buffer=shm.buf)
+            np.concatenate(self._blocks, out=panel)
+            results = self._evaluate(tasks, panel, shm.name)
+        finally:
+            del panel
+            try:
+                shm.close()
+            except BufferError:
+                self.logger.warning("Sweep panel still referenced, leaving shared memory mapped until it is released")
+            finally:
+                shm.unlink()
+        table = pd.DataFrame([row for rows in results for row in rows])
+        table = table.sort_values(rank_by, ascending=ascending, kind='stable').reset_index(drop=True)
+        table.index = table.index + 1
+        table.index.name = 'rank'
+        return table
+    def _evaluate(self, tasks: List[Dict], panel: np.ndarray, shm_name: str) -> List[List[Dict]]:
+        workers = min(self.max_workers or os.cpu_count() or 1, len(tasks))
+        if workers <= 1:
+            return [evaluate_signal_parameters(task, panel) for task in tasks]
+        from concurrent.futures import ProcessPoolExecutor
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach_panel,
+                                     initargs=(shm_name, panel.shape)) as executor:
+                return list(executor.map(evaluate_signal_parameters, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+        except Exception as e:
+            self.logger.warning(f"Process pool unavailable ({e}), running sweep serially")
+            return [evaluate_signal_parameters(task, panel) for task in tasks]
@@ -0,0 +1,16 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+@pytest.fixture
+def daily_bars():
+    def build(start: str, end: str, tz: str = 'America/New_York') -> pd.DataFrame:
+        index = pd.bdate_range(start, end, tz=tz)
+        close = np.linspace(100.0, 110.0, len(index))
+        return pd.DataFrame({'Open': close, 'High': close, 'Low': close, 'Close': close, 'Volume': 1000.0},
+                            index=index)
+    return build
@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+from analyser import IndicatorStream, TechnicalAnalyzer
+def make_bars(count: int, seed: int = 11) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, count)))
+    return pd.DataFrame({
+        'Open': close * (1 + rng.normal(0, 0.003, count)),
+        'High': close * (1 + np.abs(rng.normal(0, 0.01, count))),
+        'Low': close * (1 - np.abs(rng.normal(0, 0.01, count))),
+        'Close': close,
+        'Volume': rng.integers(100_000, 1_000_000, count).astype(float)
+    }, index=pd.date_range('2024-01-02', periods=count, freq='B'))
+def test_stream_matches_batch_features_and_signals():
+    analyzer = TechnicalAnalyzer()
+    bars = make_bars(200)
+    feature_matrix = analyzer.get_feature_matrix(bars)
+    stream = IndicatorStream('TEST', 'NASDAQ')
+    for i, (_, bar) in enumerate(bars.iterrows()):
+        update = stream.update(bar)
+        if i < 49:
+            continue
+        np.testing.assert_allclose(update['features'], feature_matrix[i], rtol=1e-9, atol=1e-9)
+        batch_signal = analyzer.generate_trading_signals(bars.iloc[:i + 1])
+        assert update['signal']['signal'] == batch_signal['signal']
+        assert np.isclose(update['signal']['strength'], batch_signal['strength'])
@@ -0,0 +1,100 @@
+import os
+import sys
+import numpy as np
+from neuralnetwork import TradingNeuralNetwork
+from numpy_inference import NumpyTradingModel, export_numpy_model
+class Dense:
+    def __init__(self, rng, inputs: int, units: int, activation: str):
+        self.weights = [rng.normal(0, 0.5, (inputs, units)).astype(np.float32),
+                        rng.normal(0, 0.1, units).astype(np.float32)]
+        self.activation = activation
+    def get_config(self):
+        return {'activation': self.activation}
+    def get_weights(self):
+        return self.weights
+    def forward(self, x):
+        x = x @ self.weights[0] + self.weights[1]
+        if self.activation == 'relu':
+            return np.maximum(x, 0.0)
+        if self.activation == 'softmax':
+            shifted = np.exp(x - x.max(axis=1, keepdims=True))
+            return shifted / shifted.sum(axis=1, keepdims=True)
+        return x
+class BatchNormalization:
+    def __init__(self, rng, units: int, epsilon: float = 1e-3):
+        self.weights = [rng.uniform(0.5, 1.5, units), rng.normal(0, 0.2, units),
+                        rng.normal(0, 0.5, units), rng.uniform(0.2, 2.0, units)]
+        self.epsilon = epsilon
+    def get_config(self):
+        return {'scale': True, 'center': True, 'epsilon': self.epsilon}
+    def get_weights(self):
+        return self.weights
+    def forward(self, x):
+        gamma, beta, mean, variance = self.weights
+        return gamma * (x - mean) / np.sqrt(variance + self.epsilon) + beta
+class Dropout:
+    def get_config(self):
+        return {}
+    def forward(self, x):
+        return x
+class Model:
+    def __init__(self, layers):
+        self.layers = layers
+    def count_params(self):
+        return sum(int(np.size(weights)) for layer in self.layers if hasattr(layer, 'weights') for weights in layer.weights)
+    def predict(self, x):
+        for layer in self.layers:
+            x = layer.forward(x)
+        return x
+class Scaler:
+    def __init__(self, rng, features: int):
+        self.mean_ = rng.normal(0, 1, features)
+        self.scale_ = rng.uniform(0.5, 2.0, features)
+def test_folded_model_matches_unfolded_forward_pass(tmp_path):
+    rng = np.random.default_rng(3)
+    model = Model([
+        Dense(rng, 12, 16, 'relu'), BatchNormalization(rng, 16), Dropout(),
+        Dense(rng, 16, 8, 'relu'), BatchNormalization(rng, 8), BatchNormalization(rng, 8),
+        Dense(rng, 8, 3, 'softmax')
+    ])
+    scaler = Scaler(rng, 12)
+    path = export_numpy_model(model, scaler, ['BUY', 'HOLD', 'SELL'], str(tmp_path / 'model.npz'))
+    numpy_model = NumpyTradingModel(path)
+    features = rng.normal(0, 2, (64, 12))
+    expected = model.predict((features - scaler.mean_) / scaler.scale_)
+    np.testing.assert_allclose(numpy_model.predict_proba(features), expected, rtol=1e-5, atol=1e-6)
+    predictions = numpy_model.predict_batch(features)
+    assert [prediction['prediction'] for prediction in predictions] == [
+        ['BUY', 'HOLD', 'SELL'][i] for i in expected.argmax(axis=1)]
+def export_stub_model(path: str) -> Model:
+    rng = np.random.default_rng(5)
+    model = Model([Dense(rng, 12, 8, 'relu'), Dense(rng, 8, 3, 'softmax')])
+    export_numpy_model(model, Scaler(rng, 12), ['BUY', 'HOLD', 'SELL'], path)
+    return model
+def test_numpy_weights_alone_serve_predictions(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('models')
+    export_stub_model(os.path.join('models', 'trading_model.npz'))
+    network = TradingNeuralNetwork()
+    assert network.is_trained
+    predictions = network.predict_batch(np.random.default_rng(1).normal(0, 1, (4, 12)))
+    assert all('error' not in prediction for prediction in predictions)
+    assert network.numpy_model is not None
+    assert 'tensorflow' not in sys.modules
+def test_unloadable_weights_report_untrained(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('models')
+    with open(os.path.join('models', 'trading_model.npz'), 'wb') as f:
+        f.write(b'not an archive')
+    info = TradingNeuralNetwork().get_model_info()
+    assert not info['is_trained']
+    assert info['classes'] == ['BUY', 'SELL', 'HOLD']
+def test_model_info_reads_saved_classes_without_loading_keras(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('models')
+    export_stub_model(os.path.join('models', 'trading_model.npz'))
+    info = TradingNeuralNetwork().get_model_info()
+    assert info['is_trained']
+    assert info['classes'] == ['BUY', 'HOLD', 'SELL']
+    assert info['input_shape'] == (None, 12)
+    assert info['total_params'] == 12 * 8 + 8 + 8 * 3 + 3
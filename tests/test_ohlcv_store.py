@@ -0,0 +1,31 @@
+import pandas as pd
+from ohlcv_store import OHLCVStore
+def test_exchange_symbols_match_stored_exchange(tmp_path, daily_bars):
+    store = OHLCVStore(str(tmp_path))
+    bars = daily_bars('2026-01-01', '2026-02-11')
+    store.append('AAPL', '1d', bars, symbol='AAPL', exchange='NASDAQ')
+    store.append('BRK-B', '1d', bars, symbol='BRK-B', exchange='NYSE')
+    store.append('TCS.NS', '1d', bars, symbol='TCS', exchange='NSE')
+    store.append('UNKNOWN', '1d', bars)
+    assert store.exchange_symbols('1d', 'NASDAQ') == ['AAPL']
+    assert store.exchange_symbols('1d', 'NYSE') == ['BRK-B']
+    assert store.exchange_symbols('1d', 'NSE') == ['TCS']
+    assert store.exchange_symbols('1wk', 'NASDAQ') == []
+def test_append_records_exchange_for_existing_entry(tmp_path, daily_bars):
+    store = OHLCVStore(str(tmp_path))
+    bars = daily_bars('2026-01-01', '2026-02-11')
+    store.append('MSFT', '1d', bars.iloc[:20])
+    assert store.exchange_symbols('1d', 'NASDAQ') == []
+    store.append('MSFT', '1d', bars.iloc[18:], symbol='MSFT', exchange='NASDAQ')
+    assert store.exchange_symbols('1d', 'NASDAQ') == ['MSFT']
+    assert store.read('MSFT', '1d').equals(bars)
+def test_covers_window_starting_on_a_weekend(tmp_path, monkeypatch, daily_bars):
+    store = OHLCVStore(str(tmp_path))
+    now = pd.Timestamp('2026-03-09 15:30', tz='America/New_York')
+    monkeypatch.setattr(pd.Timestamp, 'now', classmethod(lambda cls, tz=None: now))
+    assert (now - store.PERIOD_OFFSETS['3mo']).day_name() == 'Tuesday'
+    assert store.covers(daily_bars('2025-12-09', '2026-03-09'), '3mo')
+    saturday = pd.Timestamp('2026-03-14 10:00', tz='America/New_York')
+    monkeypatch.setattr(pd.Timestamp, 'now', classmethod(lambda cls, tz=None: saturday))
+    assert store.covers(daily_bars('2025-12-15', '2026-03-13'), '3mo')
+    assert not store.covers(daily_bars('2025-12-22', '2026-03-13'), '3mo')
@@ -0,0 +1,12 @@
+from portfolio import ExposureIndex, Position
+def test_exposure_index_totals_cost_basis():
+    index = ExposureIndex()
+    index.update('alice', ('AAPL', 'NASDAQ'), Position('AAPL', 'NASDAQ', 10, 150.0, '', ''))
+    index.update('bob', ('AAPL', 'NASDAQ'), Position('AAPL', 'NASDAQ', 5, 120.0, '', ''))
+    index.update('bob', ('TCS', 'NSE'), Position('TCS', 'NSE', 100, 30.0, '', ''))
+    assert index.get('aapl', 'nasdaq') == {'symbol': 'AAPL', 'exchange': 'NASDAQ', 'quantity': 15,
+                                           'cost_basis': 2100.0, 'holders': 2}
+    assert [entry['symbol'] for entry in index.top(2)] == ['TCS', 'AAPL']
+    assert [entry['symbol'] for entry in index.top(2, by='quantity')] == ['TCS', 'AAPL']
+    index.update('alice', ('AAPL', 'NASDAQ'), None)
+    assert index.get('AAPL', 'NASDAQ')['cost_basis'] == 600.0
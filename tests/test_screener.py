@@ -0,0 +1,17 @@
+import numpy as np
+from screener import SCREEN_METRICS, MarketScreener
+def make_metrics() -> dict:
+    metrics = {'symbols': np.array(['A', 'B', 'C'], dtype=object)}
+    for metric in SCREEN_METRICS:
+        metrics[metric] = np.array([1.0, 2.0, 3.0])
+    metrics['period_change_percent'] = np.array([5.0, np.nan, -9.0])
+    metrics['change'] = np.array([np.nan, 1.0, 1.0])
+    return metrics
+def test_top_skips_rows_without_requested_price_fields():
+    screener = MarketScreener(None)
+    rows = screener.top(make_metrics(), 'period_change_percent', 10, absolute=True,
+                        fields=['price', 'period_change', 'period_change_percent', 'volume'])
+    assert [row['symbol'] for row in rows] == ['C', 'A']
+    assert all(isinstance(row['period_change_percent'], float) for row in rows)
+    rows = screener.top(make_metrics(), 'volume', 10, fields=['price', 'change', 'change_percent', 'volume'])
+    assert [row['symbol'] for row in rows] == ['C', 'B']
@@ -0,0 +1,30 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import sweep
+from sweep import ParameterSweep
+def make_bars(count: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, count)))
+    return pd.DataFrame({'Open': close, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close,
+                         'Volume': rng.integers(1, 5, count) * 1e5}, index=pd.bdate_range('2020-01-01', periods=count))
+def loaded_sweep() -> ParameterSweep:
+    parameter_sweep = ParameterSweep(max_workers=1)
+    for seed in range(3):
+        parameter_sweep.add_data(f'S{seed}', 'NASDAQ', make_bars(300, seed))
+    return parameter_sweep
+def test_unused_volume_low_is_rejected():
+    with pytest.raises(ValueError, match='volume_low'):
+        loaded_sweep().run({'volume_low': [0.5, 0.7]})
+    assert 'volume_low' not in loaded_sweep().run({'vote_margin': [0, 1]}).columns
+@pytest.mark.skipif(not os.path.isdir('/dev/shm'), reason='needs /dev/shm to observe shared memory segments')
+def test_shared_panel_released_when_evaluation_fails(monkeypatch):
+    def failing_evaluation(task, panel=None):
+        window = panel[:10]
+        raise RuntimeError('evaluation failed')
+    monkeypatch.setattr(sweep, 'evaluate_signal_parameters', failing_evaluation)
+    before = set(os.listdir('/dev/shm'))
+    with pytest.raises(RuntimeError, match='evaluation failed'):
+        loaded_sweep().run({'vote_margin': [0, 1]})
+    assert set(os.listdir('/dev/shm')) - before == set()
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+from analyser import IndicatorStream, TechnicalAnalyzer
+from neuralnetwork import bar_timestamps, build_symbol_training_arrays, training_history
+from training_dataset import TrainingDatasetStore
+def make_bars(count: int, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, count)))
+    return pd.DataFrame({
+        'Open': close * (1 + rng.normal(0, 0.003, count)),
+        'High': close * 1.01,
+        'Low': close * 0.99,
+        'Close': close,
+        'Volume': rng.integers(100_000, 1_000_000, count).astype(float)
+    }, index=pd.date_range('2023-01-02', periods=count, freq='B', tz='America/New_York'))
+class CountingAnalyzer(TechnicalAnalyzer):
+    def __init__(self):
+        super().__init__()
+        self.feature_rows = 0
+    def get_feature_matrix(self, data):
+        self.feature_rows += len(data)
+        return super().get_feature_matrix(data)
+def training_task(window: pd.DataFrame, history: pd.DataFrame = None):
+    return ('TEST', 'NYSE', training_history(window, history), int(bar_timestamps(window)[0]))
+def assert_cache_parity(task, analyzer: TechnicalAnalyzer, dataset_dir) -> dict:
+    cold = build_symbol_training_arrays(task, analyzer)
+    cached = build_symbol_training_arrays(task, analyzer, str(dataset_dir))
+    assert cold['error'] is None and cached['error'] is None
+    np.testing.assert_array_equal(cached['labels'], cold['labels'])
+    np.testing.assert_allclose(cached['features'], cold['features'], rtol=1e-9, atol=1e-9)
+    return cached
+def test_cached_training_arrays_match_cold_path(tmp_path):
+    analyzer = TechnicalAnalyzer()
+    bars = make_bars(320)
+    assert_cache_parity(training_task(bars.iloc[:250]), analyzer, tmp_path)
+    assert_cache_parity(training_task(bars.iloc[:250]), analyzer, tmp_path)
+    assert_cache_parity(training_task(bars.iloc[:280]), analyzer, tmp_path)
+def test_sliding_window_matches_cold_path_from_stored_history(tmp_path):
+    analyzer = TechnicalAnalyzer()
+    bars = make_bars(320)
+    for end in (250, 251, 260):
+        window = bars.iloc[end - 126:end]
+        cached = assert_cache_parity(training_task(window, bars.iloc[:end]), analyzer, tmp_path)
+        assert len(cached['labels']) == len(window) - 5
+def test_sliding_window_computes_only_new_rows(tmp_path, monkeypatch):
+    analyzer = CountingAnalyzer()
+    store = TrainingDatasetStore(str(tmp_path), analyzer)
+    bars = make_bars(200)
+    store.update('TEST', 'NYSE', bars.iloc[0:126])
+    assert analyzer.feature_rows == 126
+    streamed = []
+    original_update = IndicatorStream.update
+    def counting_update(stream, bar):
+        streamed.append(bar.name)
+        return original_update(stream, bar)
+    monkeypatch.setattr(IndicatorStream, 'update', counting_update)
+    timestamps, features, closes = store.update('TEST', 'NYSE', bars.iloc[1:127])
+    assert analyzer.feature_rows == 126
+    assert streamed == [bars.index[126]]
+    np.testing.assert_array_equal(timestamps, bar_timestamps(bars.iloc[:127]))
+    np.testing.assert_allclose(features, TechnicalAnalyzer().get_feature_matrix(bars.iloc[:127]), rtol=1e-9, atol=1e-9)
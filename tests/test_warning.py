@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+from warning import AlertLevel, WarningSystem
+class FakeFetcher:
+    def __init__(self):
+        self.prices = {}
+        self.bar_requests = 0
+    def is_market_open(self, exchange: str) -> bool:
+        return True
+    def get_stock_data_many(self, symbols, exchange, period='3mo', interval='1d', fallback_periods=None,
+                            min_records=0):
+        self.bar_requests += 1
+        index = pd.date_range('2026-01-01', periods=21, freq='B')
+        data = pd.DataFrame({'Close': np.full(21, 100.0), 'Volume': np.full(21, 1000.0)}, index=index)
+        return {symbol: {'data': data, 'error': None} for symbol in symbols}
+    def get_current_prices(self, positions):
+        return {key: self.prices.get(key, 0.0) for key in positions}
+def test_poll_alerts_on_price_change_between_polls():
+    fetcher = FakeFetcher()
+    system = WarningSystem(fetcher)
+    system.watch_symbol('AAPL', 'NASDAQ')
+    fetcher.prices[('AAPL', 'NASDAQ')] = 100.5
+    assert system.poll_once() == []
+    fetcher.prices[('AAPL', 'NASDAQ')] = 112.0
+    alerts = system.poll_once()
+    assert [(alert.symbol, alert.level) for alert in alerts] == [('AAPL', AlertLevel.CRITICAL)]
+    assert alerts[0].current_price == 112.0
+    assert alerts[0].price_change_percent == 12.0
+    assert system.poll_count == 2
+def test_poll_fires_price_alert_when_quote_crosses_target():
+    fetcher = FakeFetcher()
+    system = WarningSystem(fetcher)
+    system.watch_symbol('AAPL', 'NASDAQ')
+    system.set_price_alert('AAPL', 'NASDAQ', 102.0)
+    fetcher.prices[('AAPL', 'NASDAQ')] = 101.0
+    assert system.poll_once() == []
+    fetcher.prices[('AAPL', 'NASDAQ')] = 103.0
+    alerts = system.poll_once()
+    assert len(alerts) == 1
+    assert alerts[0].level == AlertLevel.WARNING
+    assert alerts[0].current_price == 103.0
+    assert system.get_active_alerts() == []
+class FakePortfolioManager:
+    def __init__(self, positions):
+        self.positions = positions
+    def get_user_positions(self, user_id: str):
+        return self.positions
+def test_portfolio_scan_uses_fresh_quotes():
+    fetcher = FakeFetcher()
+    system = WarningSystem(fetcher, portfolio_manager=FakePortfolioManager([{'symbol': 'TCS', 'exchange': 'NSE'}]))
+    fetcher.prices[('TCS', 'NSE')] = 101.0
+    assert system.check_portfolio_alerts('demo') == []
+    fetcher.prices[('TCS', 'NSE')] = 93.0
+    alerts = system.check_portfolio_alerts('demo')
+    assert [(alert.symbol, alert.level, alert.current_price) for alert in alerts] == [('TCS', AlertLevel.WARNING, 93.0)]
+def test_history_size_must_be_positive():
+    with pytest.raises(ValueError):
+        WarningSystem(history_size=0)
+def test_history_keeps_latest_alert_with_single_slot():
+    system = WarningSystem(history_size=1)
+    system.check_price('AAPL', 'NASDAQ', 100.0)
+    for price in (101.0, 99.0):
+        system.set_price_alert('AAPL', 'NASDAQ', 100.0, 'above' if price > 100 else 'below')
+        system.check_price('AAPL', 'NASDAQ', price)
+    assert [alert.current_price for alert in system.get_recent_alerts()] == [99.0]
+    assert system.get_system_status()['history_size'] == 1
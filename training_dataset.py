@@ -0,0 +1,104 @@
+import hashlib
+import inspect
+import json
+import logging
+import os
+import pickle
+import shutil
+from typing import Dict, Optional, Tuple
+import numpy as np
+import pandas as pd
+import analyser
+from analyser import IndicatorStream, TechnicalAnalyzer
+def feature_version() -> str:
+    digest = hashlib.sha1()
+    for source in (analyser.TechnicalAnalyzer.get_feature_matrix, analyser.IndicatorStream):
+        digest.update(inspect.getsource(source).encode())
+    digest.update(analyser.FEATURE_LOWER_BOUNDS.tobytes())
+    digest.update(analyser.FEATURE_UPPER_BOUNDS.tobytes())
+    return digest.hexdigest()[:12]
+class TrainingDatasetStore:
+    def __init__(self, root_dir: str = os.path.join('data', 'training'), technical_analyzer: Optional[TechnicalAnalyzer] = None):
+        self.logger = logging.getLogger(__name__)
+        self.root_dir = root_dir
+        self.version = feature_version()
+        self.technical_analyzer = technical_analyzer or TechnicalAnalyzer()
+        os.makedirs(self.root_dir, exist_ok=True)
+    def _symbol_dir(self, symbol: str, exchange: str) -> str:
+        return os.path.join(self.root_dir, f"{exchange}_{symbol}".replace(os.sep, '_'))
+    def _load(self, symbol: str, exchange: str) -> Optional[Dict]:
+        entry_dir = os.path.join(self._symbol_dir(symbol, exchange), self.version)
+        meta_path = os.path.join(entry_dir, 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        with open(os.path.join(entry_dir, 'stream.pkl'), 'rb') as f:
+            stream = pickle.load(f)
+        return {
+            'meta': meta,
+            'timestamps': np.load(os.path.join(entry_dir, 'timestamps.npy'), mmap_mode='r'),
+            'features': np.load(os.path.join(entry_dir, 'features.npy'), mmap_mode='r'),
+            'closes': np.load(os.path.join(entry_dir, 'closes.npy'), mmap_mode='r'),
+            'stream': stream
+        }
+    def _save(self, symbol: str, exchange: str, timestamps: np.ndarray, features: np.ndarray,
+              closes: np.ndarray, stream: IndicatorStream):
+        symbol_dir = self._symbol_dir(symbol, exchange)
+        entry_dir = os.path.join(symbol_dir, self.version)
+        tmp_dir = entry_dir + '.tmp'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        np.save(os.path.join(tmp_dir, 'timestamps.npy'), timestamps)
+        np.save(os.path.join(tmp_dir, 'features.npy'), features)
+        np.save(os.path.join(tmp_dir, 'closes.npy'), closes)
+        with open(os.path.join(tmp_dir, 'stream.pkl'), 'wb') as f:
+            pickle.dump(stream, f)
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+            json.dump({'symbol': symbol, 'exchange': exchange, 'version': self.version,
+                       'rows': len(timestamps), 'last_timestamp': int(timestamps[-1])}, f)
+        for name in os.listdir(symbol_dir):
+            if name not in (self.version, self.version + '.tmp'):
+                shutil.rmtree(os.path.join(symbol_dir, name), ignore_errors=True)
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.replace(tmp_dir, entry_dir)
+    def _rebuild(self, symbol: str, exchange: str, data: pd.DataFrame, timestamps: np.ndarray):
+        features = self.technical_analyzer.get_feature_matrix(data)
+        if features.shape != (len(data), 12):
+            raise ValueError("Feature calculation failed")
+        stream = IndicatorStream(symbol, exchange)
+        stream.warm_up(data)
+        closes = data['Close'].to_numpy(dtype=float)
+        self._save(symbol, exchange, timestamps, features, closes, stream)
+        self.logger.info(f"Built {len(timestamps)} feature rows for {symbol} ({exchange})")
+        return timestamps, features, closes
+    def update(self, symbol: str, exchange: str, data: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        timestamps = pd.DatetimeIndex(data.index).as_unit('ns').asi8.astype(np.int64)
+        entry = self._load(symbol, exchange)
+        if entry is None:
+            return self._rebuild(symbol, exchange, data, timestamps)
+        stored_timestamps = entry['timestamps']
+        first = int(np.searchsorted(stored_timestamps, timestamps[0]))
+        if first >= len(stored_timestamps) or stored_timestamps[first] != timestamps[0]:
+            self.logger.info(f"Stored dataset for {symbol} does not overlap new data, rebuilding")
+            return self._rebuild(symbol, exchange, data, timestamps)
+        closes = data['Close'].to_numpy(dtype=float)
+        overlap = min(len(stored_timestamps) - first, len(timestamps))
+        if (not np.array_equal(stored_timestamps[first:first + overlap], timestamps[:overlap]) or
+                not np.allclose(entry['closes'][first:first + overlap], closes[:overlap], rtol=1e-9, atol=0.0)):
+            self.logger.info(f"Price history for {symbol} was revised, rebuilding dataset")
+            return self._rebuild(symbol, exchange, data, timestamps)
+        end = first + len(timestamps)
+        new_bars = data.iloc[overlap:]
+        if new_bars.empty:
+            return (np.asarray(stored_timestamps[:end]), np.asarray(entry['features'][:end]),
+                    np.asarray(entry['closes'][:end]))
+        stream = entry['stream']
+        new_features = np.array([stream.update(bar)['features'] for _, bar in new_bars.iterrows()], dtype=float)
+        all_timestamps = np.concatenate([stored_timestamps, timestamps[overlap:]])
+        all_features = np.concatenate([entry['features'], new_features])
+        all_closes = np.concatenate([entry['closes'], closes[overlap:]])
+        del entry, stored_timestamps
+        self._save(symbol, exchange, all_timestamps, all_features, all_closes, stream)
+        self.logger.info(f"Appended {len(new_bars)} feature rows for {symbol} ({exchange})")
+        return all_timestamps, all_features, all_closes
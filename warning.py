@@ -1,13 +1,22 @@
+import bisect
+import itertools
 import logging
+import queue
 import random
-from typing import Dict, List, Optional, Callable
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Callable, Tuple
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from enum import Enum
+import numpy as np
 class AlertLevel(Enum):
     INFO = "INFO"
     WARNING = "WARNING"
     CRITICAL = "CRITICAL"
+ALERT_LEVEL_RANK = {AlertLevel.INFO: 0, AlertLevel.WARNING: 1, AlertLevel.CRITICAL: 2}
 @dataclass
 class Alert:
     symbol: str
@@ -19,14 +28,52 @@ class Alert:
     volume_ratio: float
     timestamp: datetime
 class WarningSystem:
-    def __init__(self, data_fetcher=None):
+    def __init__(self, data_fetcher=None, portfolio_manager=None, poll_interval: float = 60.0, batch_size: int = 50,
+                 history_period: str = '1mo', volume_window: int = 20, dispatch_workers: int = 4,
+                 dispatch_queue_size: int = 1000, slow_callback_threshold: float = 5.0, coalesce_window: float = 0.0,
+                 callback_backlog: int = 100, history_size: int = 5000, history_bucket_seconds: int = 60):
+        if history_size < 1:
+            raise ValueError(f"history_size must be at least 1, got {history_size}")
+        if history_bucket_seconds <= 0:
+            raise ValueError(f"history_bucket_seconds must be positive, got {history_bucket_seconds}")
         self.logger = logging.getLogger(__name__)
         self.data_fetcher = data_fetcher
+        self.portfolio_manager = portfolio_manager
         self.is_enabled = True
         self.is_running = False
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.history_period = history_period
+        self.volume_window = volume_window
+        self.watchlist = {}
+        self.last_alert_levels = {}
+        self.poll_count = 0
+        self.last_poll_time = None
+        self._stop_event = threading.Event()
+        self._monitor_thread = None
+        self.dispatch_workers = dispatch_workers
+        self.slow_callback_threshold = slow_callback_threshold
+        self.callback_backlog = callback_backlog
+        self.coalesce_window = coalesce_window
+        self.dispatch_stats = {'enqueued': 0, 'delivered': 0, 'dropped': 0, 'coalesced': 0,
+                               'slow_callbacks': 0, 'errors': 0, 'max_queue_depth': 0}
+        self._dispatch_queue = queue.Queue(maxsize=dispatch_queue_size)
+        self._dispatch_lock = threading.Lock()
+        self._dispatch_thread = None
+        self._callback_lanes = {}
+        self._last_dispatched = {}
         self.alert_callbacks = []
-        self.recent_alerts = []
-        self.logger.info("Mock Warning System initialized")
+        self.recent_alerts = deque(maxlen=history_size)
+        self.history_bucket_seconds = history_bucket_seconds
+        self.alert_buckets = deque()
+        self.alert_level_counts = {level: 0 for level in AlertLevel}
+        self.total_alerts = 0
+        self._history_lock = threading.Lock()
+        self.price_alerts = {}
+        self.price_alert_index = {}
+        self._price_alert_ids = itertools.count(1)
+        self._price_alert_lock = threading.Lock()
+        self.logger.info(f"Warning system initialized ({'live' if data_fetcher is not None else 'mock'} monitoring)")
     def add_alert_callback(self, callback: Callable[[Alert], None]):
         self.alert_callbacks.append(callback)
         self.logger.info("Alert callback added")
@@ -36,13 +83,115 @@ class WarningSystem:
     def disable(self):
         self.is_enabled = False
         self.logger.info("Warning system disabled")
+    def watch_symbol(self, symbol: str, exchange: str):
+        self.watchlist[(symbol.upper(), exchange.upper())] = datetime.now()
+    def watch_symbols(self, positions: List[Tuple[str, str]]):
+        for symbol, exchange in positions:
+            self.watch_symbol(symbol, exchange)
+    def unwatch_symbol(self, symbol: str, exchange: str) -> bool:
+        key = (symbol.upper(), exchange.upper())
+        self.last_alert_levels.pop(key, None)
+        return self.watchlist.pop(key, None) is not None
     def start_monitoring(self):
+        if self.data_fetcher is None:
+            self.is_running = True
+            self.logger.info("Mock monitoring started")
+            self._generate_mock_alert()
+            return
+        if self._monitor_thread is not None and self._monitor_thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._monitor_thread = threading.Thread(target=self._monitor_loop, name='warning-monitor', daemon=True)
         self.is_running = True
-        self.logger.info("Mock monitoring started")
-        self._generate_mock_alert()
-    def stop_monitoring(self):
+        self._monitor_thread.start()
+        self.logger.info(f"Monitoring started ({len(self.watchlist)} symbols every {self.poll_interval}s)")
+    def stop_monitoring(self, timeout: Optional[float] = None):
         self.is_running = False
+        self._stop_event.set()
+        thread = self._monitor_thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        self._monitor_thread = None
         self.logger.info("Monitoring stopped")
+    def _monitor_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                self.logger.error(f"Error in monitoring loop: {e}")
+            self._stop_event.wait(self.poll_interval)
+    def poll_once(self) -> List[Alert]:
+        by_exchange = {}
+        for symbol, exchange in list(self.watchlist):
+            by_exchange.setdefault(exchange, []).append(symbol)
+        alerts = []
+        for exchange, symbols in by_exchange.items():
+            if self._stop_event.is_set():
+                break
+            if not self.data_fetcher.is_market_open(exchange):
+                continue
+            for start in range(0, len(symbols), self.batch_size):
+                if self._stop_event.is_set():
+                    break
+                batch_symbols = symbols[start:start + self.batch_size]
+                batch = self.data_fetcher.get_stock_data_many(
+                    batch_symbols, exchange, period=self.history_period, interval='1d',
+                    fallback_periods=['3mo'], min_records=2
+                )
+                prices = self.data_fetcher.get_current_prices([(symbol, exchange) for symbol in batch_symbols])
+                for symbol, result in batch.items():
+                    data = result['data']
+                    if data is None or len(data) < 2:
+                        continue
+                    alerts.extend(self._evaluate_market_data(symbol, exchange, data, prices.get((symbol, exchange))))
+        self.poll_count += 1
+        self.last_poll_time = datetime.now()
+        return alerts
+    def _movement_level(self, price_change: float, volume_ratio: float) -> AlertLevel:
+        if abs(price_change) > 10 or volume_ratio > 3:
+            return AlertLevel.CRITICAL
+        if abs(price_change) > 5 or volume_ratio > 2:
+            return AlertLevel.WARNING
+        return AlertLevel.INFO
+    def _movement_message(self, price_change: float, volume_ratio: float) -> str:
+        if price_change > 0:
+            message = f"Strong upward movement detected (+{price_change:.1f}%)"
+        elif price_change < -5:
+            message = f"Significant price drop detected ({price_change:.1f}%)"
+        else:
+            message = "Price movement within normal range"
+        if volume_ratio > 2:
+            message += f" with high volume ({volume_ratio:.1f}x average)"
+        return message
+    def _evaluate_market_data(self, symbol: str, exchange: str, data, price: Optional[float] = None) -> List[Alert]:
+        closes = data['Close'].to_numpy(dtype=float)
+        volumes = data['Volume'].to_numpy(dtype=float)
+        price = price if price is not None and price > 0 else closes[-1]
+        price_change = (price - closes[-2]) / closes[-2] * 100 if closes[-2] else 0.0
+        average_volume = volumes[-self.volume_window - 1:-1].mean()
+        volume_ratio = volumes[-1] / average_volume if average_volume > 0 else 1.0
+        alerts = self.check_price(symbol, exchange, price, price_change, volume_ratio)
+        level = self._movement_level(price_change, volume_ratio)
+        key = (symbol.upper(), exchange.upper())
+        session = data.index[-1]
+        previous = self.last_alert_levels.get(key)
+        if level == AlertLevel.INFO or (previous is not None and previous[0] == session and
+                                        ALERT_LEVEL_RANK[previous[1]] >= ALERT_LEVEL_RANK[level]):
+            return alerts
+        self.last_alert_levels[key] = (session, level)
+        alert = Alert(
+            symbol=key[0],
+            exchange=key[1],
+            level=level,
+            message=self._movement_message(price_change, volume_ratio),
+            current_price=round(price, 2),
+            price_change_percent=round(price_change, 2),
+            volume_ratio=round(volume_ratio, 2),
+            timestamp=datetime.now()
+        )
+        self._dispatch_alert(alert)
+        alerts.append(alert)
+        return alerts
     def _generate_mock_alert(self):
         try:
             stocks = [
@@ -56,20 +205,8 @@ class WarningSystem:
             price = random.uniform(50, 300)
             price_change = random.uniform(-15, 15)
             volume_ratio = random.uniform(0.5, 5.0)
-            if abs(price_change) > 10 or volume_ratio > 3:
-                level = AlertLevel.CRITICAL
-            elif abs(price_change) > 5 or volume_ratio > 2:
-                level = AlertLevel.WARNING
-            else:
-                level = AlertLevel.INFO
-            if price_change > 0:
-                message = f"Strong upward movement detected (+{price_change:.1f}%)"
-            elif price_change < -5:
-                message = f"Significant price drop detected ({price_change:.1f}%)"
-            else:
-                message = "Price movement within normal range"
-            if volume_ratio > 2:
-                message += f" with high volume ({volume_ratio:.1f}x average)"
+            level = self._movement_level(price_change, volume_ratio)
+            message = self._movement_message(price_change, volume_ratio)
             alert = Alert(
                 symbol=symbol,
                 exchange=exchange,
@@ -80,75 +217,392 @@ class WarningSystem:
                 volume_ratio=round(volume_ratio, 2),
                 timestamp=datetime.now()
             )
-            self.recent_alerts.append(alert)
-            if len(self.recent_alerts) > 50:
-                self.recent_alerts.pop(0)
-            if self.is_enabled:
-                for callback in self.alert_callbacks:
-                    try:
-                        callback(alert)
-                    except Exception as e:
-                        self.logger.error(f"Error in alert callback: {e}")
+            self._dispatch_alert(alert)
         except Exception as e:
             self.logger.error(f"Error generating mock alert: {e}")
+    def _start_dispatcher(self):
+        with self._dispatch_lock:
+            if self._dispatch_thread is not None:
+                return
+            self._dispatch_thread = threading.Thread(target=self._dispatch_loop, name='alert-dispatch', daemon=True)
+            self._dispatch_thread.start()
+    def _callback_lane(self, callback: Callable[[Alert], None]) -> Dict:
+        with self._dispatch_lock:
+            lane = self._callback_lanes.get(callback)
+            if lane is None:
+                lane = {
+                    'executor': ThreadPoolExecutor(max_workers=self.dispatch_workers, thread_name_prefix='alert-callback'),
+                    'in_flight': 0
+                }
+                self._callback_lanes[callback] = lane
+            return lane
+    def _dispatch_loop(self):
+        while True:
+            item = self._dispatch_queue.get()
+            try:
+                if item is None:
+                    return
+                alert, callback = item
+                lane = self._callback_lane(callback)
+                with self._dispatch_lock:
+                    if lane['in_flight'] >= self.callback_backlog:
+                        self.dispatch_stats['dropped'] += 1
+                        continue
+                    lane['in_flight'] += 1
+                deadline = time.monotonic() + self.slow_callback_threshold
+                future = lane['executor'].submit(callback, alert)
+                future.add_done_callback(
+                    lambda future, lane=lane, alert=alert, deadline=deadline: self._callback_done(future, lane, alert, deadline)
+                )
+            except Exception as e:
+                self.logger.error(f"Error dispatching alert: {e}")
+            finally:
+                self._dispatch_queue.task_done()
+    def _callback_done(self, future, lane: Dict, alert: Alert, deadline: float):
+        error = future.exception()
+        late = time.monotonic() > deadline
+        with self._dispatch_lock:
+            lane['in_flight'] -= 1
+            if error is not None:
+                self.dispatch_stats['errors'] += 1
+            elif late:
+                self.dispatch_stats['slow_callbacks'] += 1
+            else:
+                self.dispatch_stats['delivered'] += 1
+        if error is not None:
+            self.logger.error(f"Error in alert callback: {error}")
+        elif late:
+            self.logger.warning(f"Alert callback exceeded {self.slow_callback_threshold}s for {alert.symbol}")
+    def _enqueue(self, item):
+        while True:
+            try:
+                self._dispatch_queue.put_nowait(item)
+                break
+            except queue.Full:
+                try:
+                    self._dispatch_queue.get_nowait()
+                    self._dispatch_queue.task_done()
+                    with self._dispatch_lock:
+                        self.dispatch_stats['dropped'] += 1
+                except queue.Empty:
+                    pass
+        with self._dispatch_lock:
+            self.dispatch_stats['enqueued'] += 1
+            depth = self._dispatch_queue.qsize()
+            if depth > self.dispatch_stats['max_queue_depth']:
+                self.dispatch_stats['max_queue_depth'] = depth
+    def _should_coalesce(self, alert: Alert) -> bool:
+        if self.coalesce_window <= 0:
+            return False
+        key = (alert.symbol, alert.exchange, alert.level)
+        now = time.monotonic()
+        with self._dispatch_lock:
+            last = self._last_dispatched.get(key)
+            if last is not None and now - last < self.coalesce_window:
+                self.dispatch_stats['coalesced'] += 1
+                return True
+            self._last_dispatched.pop(key, None)
+            self._last_dispatched[key] = now
+            oldest_key = next(iter(self._last_dispatched))
+            while now - self._last_dispatched[oldest_key] >= self.coalesce_window:
+                del self._last_dispatched[oldest_key]
+                oldest_key = next(iter(self._last_dispatched))
+        return False
+    def _dispatch_alert(self, alert: Alert):
+        self._record_alert(alert)
+        if not self.is_enabled or not self.alert_callbacks or self._should_coalesce(alert):
+            return
+        self._start_dispatcher()
+        for callback in list(self.alert_callbacks):
+            self._enqueue((alert, callback))
+    def _callbacks_in_flight(self) -> int:
+        with self._dispatch_lock:
+            return sum(lane['in_flight'] for lane in self._callback_lanes.values())
+    def wait_for_dispatch(self, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._dispatch_queue.unfinished_tasks or self._callbacks_in_flight():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+    def shutdown_dispatch(self, timeout: Optional[float] = None):
+        with self._dispatch_lock:
+            thread, self._dispatch_thread = self._dispatch_thread, None
+            lanes, self._callback_lanes = self._callback_lanes, {}
+        if thread is not None:
+            self._dispatch_queue.put(None)
+            thread.join(timeout)
+        for lane in lanes.values():
+            lane['executor'].shutdown(wait=False)
+    def get_dispatch_stats(self) -> Dict:
+        with self._dispatch_lock:
+            stats = dict(self.dispatch_stats)
+        stats['queue_depth'] = self._dispatch_queue.qsize()
+        stats['queue_capacity'] = self._dispatch_queue.maxsize
+        stats['in_flight'] = self._callbacks_in_flight()
+        return stats
+    def _record_alert(self, alert: Alert):
+        bucket_key = int(alert.timestamp.timestamp() // self.history_bucket_seconds)
+        with self._history_lock:
+            if len(self.recent_alerts) == self.recent_alerts.maxlen:
+                oldest_bucket = self.alert_buckets[0]
+                evicted = oldest_bucket['alerts'].popleft()
+                oldest_bucket['counts'][evicted.level] -= 1
+                self.alert_level_counts[evicted.level] -= 1
+                if not oldest_bucket['alerts']:
+                    self.alert_buckets.popleft()
+            self.recent_alerts.append(alert)
+            if not self.alert_buckets or bucket_key > self.alert_buckets[-1]['key']:
+                self.alert_buckets.append({'key': bucket_key, 'alerts': deque(),
+                                           'counts': {level: 0 for level in AlertLevel}})
+            bucket = self.alert_buckets[-1]
+            bucket['alerts'].append(alert)
+            bucket['counts'][alert.level] += 1
+            self.alert_level_counts[alert.level] += 1
+            self.total_alerts += 1
+    def _buckets_since(self, cutoff_time: datetime):
+        cutoff_key = int(cutoff_time.timestamp() // self.history_bucket_seconds)
+        for bucket in reversed(self.alert_buckets):
+            if bucket['key'] < cutoff_key:
+                break
+            yield bucket, bucket['key'] == cutoff_key
     def get_recent_alerts(self, hours: int = 24) -> List[Alert]:
         cutoff_time = datetime.now() - timedelta(hours=hours)
-        return [alert for alert in self.recent_alerts if alert.timestamp >= cutoff_time]
+        alerts = []
+        with self._history_lock:
+            for bucket, partial in self._buckets_since(cutoff_time):
+                if partial:
+                    alerts.extend(reversed([alert for alert in bucket['alerts'] if alert.timestamp >= cutoff_time]))
+                else:
+                    alerts.extend(reversed(bucket['alerts']))
+        alerts.reverse()
+        return alerts
+    def count_recent_alerts(self, hours: int = 24) -> Dict[AlertLevel, int]:
+        cutoff_time = datetime.now() - timedelta(hours=hours)
+        counts = {level: 0 for level in AlertLevel}
+        with self._history_lock:
+            for bucket, partial in self._buckets_since(cutoff_time):
+                if partial:
+                    for alert in bucket['alerts']:
+                        if alert.timestamp >= cutoff_time:
+                            counts[alert.level] += 1
+                else:
+                    for level, count in bucket['counts'].items():
+                        counts[level] += count
+        return counts
     def get_system_status(self) -> Dict:
+        counts = self.count_recent_alerts(24)
+        last_alert = self.recent_alerts[-1] if self.recent_alerts else None
         return {
             'enabled': self.is_enabled,
             'monitoring': self.is_running,
-            'total_alerts_24h': len(self.get_recent_alerts(24)),
-            'critical_alerts_24h': len([a for a in self.get_recent_alerts(24) if a.level == AlertLevel.CRITICAL]),
-            'warning_alerts_24h': len([a for a in self.get_recent_alerts(24) if a.level == AlertLevel.WARNING]),
-            'last_alert_time': self.recent_alerts[-1].timestamp.isoformat() if self.recent_alerts else None,
-            'callback_count': len(self.alert_callbacks)
+            'total_alerts_24h': sum(counts.values()),
+            'critical_alerts_24h': counts[AlertLevel.CRITICAL],
+            'warning_alerts_24h': counts[AlertLevel.WARNING],
+            'last_alert_time': last_alert.timestamp.isoformat() if last_alert else None,
+            'history_size': len(self.recent_alerts),
+            'history_capacity': self.recent_alerts.maxlen,
+            'history_level_counts': {level.value: count for level, count in self.alert_level_counts.items()},
+            'total_alerts': self.total_alerts,
+            'watched_symbols': len(self.watchlist),
+            'poll_count': self.poll_count,
+            'last_poll_time': self.last_poll_time.isoformat() if self.last_poll_time else None,
+            'callback_count': len(self.alert_callbacks),
+            'dispatch': self.get_dispatch_stats()
         }
-    def check_portfolio_alerts(self, user_id: str) -> List[Alert]:
+    def _get_portfolio_manager(self):
+        if self.portfolio_manager is None:
+            from portfolio import FastPortfolioManager
+            self.portfolio_manager = FastPortfolioManager(data_fetcher=self.data_fetcher)
+        return self.portfolio_manager
+    def _market_metrics(self, keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], Tuple[float, float, float, AlertLevel]]:
+        by_exchange = {}
+        for symbol, exchange in dict.fromkeys(keys):
+            by_exchange.setdefault(exchange, []).append(symbol)
+        found = []
+        closes = []
+        volumes = []
+        window = self.volume_window + 1
+        for exchange, symbols in by_exchange.items():
+            for start in range(0, len(symbols), self.batch_size):
+                batch_symbols = symbols[start:start + self.batch_size]
+                batch = self.data_fetcher.get_stock_data_many(
+                    batch_symbols, exchange, period=self.history_period, interval='1d',
+                    fallback_periods=['3mo'], min_records=2
+                )
+                prices = self.data_fetcher.get_current_prices([(symbol, exchange) for symbol in batch_symbols])
+                for symbol, result in batch.items():
+                    data = result['data']
+                    if data is None or len(data) < 2:
+                        continue
+                    found.append((symbol, exchange))
+                    last_closes = data['Close'].to_numpy(dtype=float)[-2:].copy()
+                    price = prices.get((symbol, exchange))
+                    if price is not None and price > 0:
+                        last_closes[1] = price
+                    closes.append(last_closes)
+                    volume = np.full(window, np.nan)
+                    tail = data['Volume'].to_numpy(dtype=float)[-window:]
+                    volume[window - len(tail):] = tail
+                    volumes.append(volume)
+        if not found:
+            return {}
+        closes = np.array(closes)
+        volumes = np.array(volumes)
+        previous = closes[:, 0]
+        prices = closes[:, 1]
+        price_changes = np.divide(prices - previous, previous, out=np.zeros_like(prices), where=previous != 0) * 100
+        with np.errstate(invalid='ignore'):
+            average_volumes = np.nanmean(volumes[:, :-1], axis=1)
+        volume_ratios = np.divide(volumes[:, -1], average_volumes, out=np.ones_like(prices),
+                                  where=np.nan_to_num(average_volumes) > 0)
+        moves = np.abs(price_changes)
+        levels = np.select([(moves > 10) | (volume_ratios > 3), (moves > 5) | (volume_ratios > 2)],
+                           [ALERT_LEVEL_RANK[AlertLevel.CRITICAL], ALERT_LEVEL_RANK[AlertLevel.WARNING]],
+                           ALERT_LEVEL_RANK[AlertLevel.INFO])
+        levels_by_rank = {rank: level for level, rank in ALERT_LEVEL_RANK.items()}
+        return {
+            key: (price, change, ratio, levels_by_rank[rank])
+            for key, price, change, ratio, rank in zip(found, prices.tolist(), price_changes.tolist(),
+                                                       volume_ratios.tolist(), levels.tolist())
+        }
+    def _position_alert(self, key: Tuple[str, str], metrics: Tuple[float, float, float, AlertLevel]) -> Alert:
+        price, price_change, volume_ratio, level = metrics
+        message = f"Position alert: {price_change:+.1f}% change"
+        if volume_ratio > 2:
+            message += f" with high volume ({volume_ratio:.1f}x average)"
+        return Alert(
+            symbol=key[0],
+            exchange=key[1],
+            level=level,
+            message=message,
+            current_price=round(price, 2),
+            price_change_percent=round(price_change, 2),
+            volume_ratio=round(volume_ratio, 2),
+            timestamp=datetime.now()
+        )
+    def check_portfolio_alerts(self, user_id: str, min_level: AlertLevel = AlertLevel.WARNING) -> List[Alert]:
         alerts = []
         try:
-            from fast_portfolio_manager import FastPortfolioManager
-            portfolio_manager = FastPortfolioManager()
-            positions = portfolio_manager.get_user_positions(user_id)
-            for position in positions[:2]:
-                if random.random() < 0.3:
-                    price_change = random.uniform(-10, 10)
-                    volume_ratio = random.uniform(0.5, 3.0)
-                    level = AlertLevel.WARNING if abs(price_change) > 5 else AlertLevel.INFO
-                    alert = Alert(
-                        symbol=position['symbol'],
-                        exchange=position['exchange'],
-                        level=level,
-                        message=f"Position alert: {price_change:+.1f}% change",
-                        current_price=position.get('current_price', 100.0),
-                        price_change_percent=price_change,
-                        volume_ratio=volume_ratio,
-                        timestamp=datetime.now()
-                    )
-                    alerts.append(alert)
+            if self.data_fetcher is None:
+                return alerts
+            positions = self._get_portfolio_manager().get_user_positions(user_id)
+            keys = [(position['symbol'], position['exchange']) for position in positions]
+            for key, metrics in self._market_metrics(keys).items():
+                if ALERT_LEVEL_RANK[metrics[3]] >= ALERT_LEVEL_RANK[min_level]:
+                    alerts.append(self._position_alert(key, metrics))
         except Exception as e:
             self.logger.error(f"Error checking portfolio alerts for {user_id}: {e}")
         return alerts
+    def check_all_portfolio_alerts(self, min_level: AlertLevel = AlertLevel.WARNING) -> Dict[str, List[Alert]]:
+        alerts_by_user = {}
+        try:
+            if self.data_fetcher is None:
+                return alerts_by_user
+            portfolio_manager = self._get_portfolio_manager()
+            for key, metrics in self._market_metrics(portfolio_manager.exposure.symbols()).items():
+                if ALERT_LEVEL_RANK[metrics[3]] < ALERT_LEVEL_RANK[min_level]:
+                    continue
+                alert = self._position_alert(key, metrics)
+                for user_id in portfolio_manager.get_holders(*key):
+                    alerts_by_user.setdefault(user_id, []).append(alert)
+        except Exception as e:
+            self.logger.error(f"Error checking portfolio alerts: {e}")
+        return alerts_by_user
     def set_price_alert(self, symbol: str, exchange: str, target_price: float, condition: str = 'above') -> bool:
-        self.logger.info(f"Mock price alert set: {symbol} ({exchange}) {condition} ${target_price}")
-        return True
-    def remove_price_alert(self, symbol: str, exchange: str) -> bool:
-        self.logger.info(f"Mock price alert removed: {symbol} ({exchange})")
+        return self.add_price_alert(symbol, exchange, target_price, condition) is not None
+    def add_price_alert(self, symbol: str, exchange: str, target_price: float, condition: str = 'above',
+                        user_id: Optional[str] = None) -> Optional[int]:
+        if condition not in ('above', 'below'):
+            self.logger.error(f"Invalid price alert condition: {condition}")
+            return None
+        try:
+            target_price = float(target_price)
+        except (TypeError, ValueError):
+            self.logger.error(f"Invalid price alert target: {target_price}")
+            return None
+        key = (symbol.upper(), exchange.upper())
+        with self._price_alert_lock:
+            alert_id = next(self._price_alert_ids)
+            self.price_alert_index[alert_id] = {
+                'id': alert_id,
+                'symbol': key[0],
+                'exchange': key[1],
+                'type': f'price_{condition}',
+                'condition': condition,
+                'target': target_price,
+                'user_id': user_id,
+                'created': datetime.now()
+            }
+            thresholds = self.price_alerts.setdefault(key, {'above': [], 'below': []})
+            bisect.insort(thresholds[condition], (target_price, alert_id))
+        self.logger.info(f"Price alert {alert_id} set: {key[0]} ({key[1]}) {condition} ${target_price}")
+        return alert_id
+    def remove_price_alert(self, symbol: str, exchange: str, alert_id: Optional[int] = None) -> bool:
+        key = (symbol.upper(), exchange.upper())
+        with self._price_alert_lock:
+            thresholds = self.price_alerts.get(key)
+            if thresholds is None:
+                return False
+            if alert_id is None:
+                for entries in thresholds.values():
+                    for _, entry_id in entries:
+                        self.price_alert_index.pop(entry_id, None)
+                del self.price_alerts[key]
+            else:
+                info = self.price_alert_index.get(alert_id)
+                if info is None or (info['symbol'], info['exchange']) != key:
+                    return False
+                entries = thresholds[info['condition']]
+                position = bisect.bisect_left(entries, (info['target'], alert_id))
+                del entries[position]
+                del self.price_alert_index[alert_id]
+                if not thresholds['above'] and not thresholds['below']:
+                    del self.price_alerts[key]
+        self.logger.info(f"Price alert removed: {key[0]} ({key[1]})")
         return True
+    def _pop_crossed_alerts(self, key: Tuple[str, str], price: float) -> List[Dict]:
+        with self._price_alert_lock:
+            thresholds = self.price_alerts.get(key)
+            if thresholds is None:
+                return []
+            above = thresholds['above']
+            below = thresholds['below']
+            above_end = bisect.bisect_right(above, (price, float('inf')))
+            below_start = bisect.bisect_left(below, (price, 0))
+            crossed = above[:above_end] + below[below_start:]
+            if not crossed:
+                return []
+            del above[:above_end]
+            del below[below_start:]
+            if not above and not below:
+                del self.price_alerts[key]
+            return [self.price_alert_index.pop(alert_id) for _, alert_id in crossed]
+    def check_price(self, symbol: str, exchange: str, price: float, price_change_percent: float = 0.0,
+                    volume_ratio: float = 1.0) -> List[Alert]:
+        key = (symbol.upper(), exchange.upper())
+        alerts = []
+        for info in self._pop_crossed_alerts(key, price):
+            direction = 'above' if info['condition'] == 'above' else 'below'
+            alert = Alert(
+                symbol=key[0],
+                exchange=key[1],
+                level=AlertLevel.WARNING,
+                message=f"Price {direction} target ${info['target']:.2f} (now ${price:.2f})",
+                current_price=round(price, 2),
+                price_change_percent=round(price_change_percent, 2),
+                volume_ratio=round(volume_ratio, 2),
+                timestamp=datetime.now()
+            )
+            self._dispatch_alert(alert)
+            alerts.append(alert)
+        return alerts
+    def check_prices(self, prices: Dict[Tuple[str, str], float]) -> List[Alert]:
+        alerts = []
+        for (symbol, exchange), price in prices.items():
+            if price is not None and (symbol.upper(), exchange.upper()) in self.price_alerts:
+                alerts.extend(self.check_price(symbol, exchange, price))
+        return alerts
     def get_active_alerts(self) -> List[Dict]:
-        return [
-            {
-                'symbol': 'AAPL',
-                'exchange': 'NASDAQ',
-                'type': 'price_above',
-                'target': 150.0,
-                'created': datetime.now() - timedelta(days=1)
-            },
-            {
-                'symbol': 'TSLA',
-                'exchange': 'NASDAQ',
-                'type': 'price_below',
-                'target': 200.0,
-                'created': datetime.now() - timedelta(hours=6)
-            }
-        ]
+        with self._price_alert_lock:
+            return [dict(info) for info in self.price_alert_index.values()]